@@ -4,19 +4,13 @@ set -e -x
 
 mkdir private _site public
 
-EXPORTED_DATA="static/tasks.yaml static/instances.yaml"
-
-if [[ -n "$GCI_TOKEN" ]]; then
-  python manage.py fetch_gci_task_data private
-  python manage.py cleanse_gci_task_data private _site
-  rm -rf private/
-else
-  python manage.py fetch_deployed_data _site $EXPORTED_DATA
-fi
-
-python manage.py migrate
 python manage.py test
-python manage.py import_contributors_data
-python manage.py import_openhub_data
-python manage.py collectstatic --noinput
-python manage.py distill-local public --force
+# The site is distilled into the cached .cache/site, so that the pages
+# whose inputs are unchanged since the last build are not rendered again.
+# The static files are copied on every build, and removed so that none is
+# left over from an earlier one.
+rm -rf .cache/site/static
+python manage.py build_site .cache/site --parallel 0 \
+  --manifest .cache/build-manifest.json --report build-report.json
+cp -a .cache/site/. public/
+rm -rf private/
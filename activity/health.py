@@ -0,0 +1,235 @@
+import collections
+import datetime
+import math
+
+from dateutil import parser, relativedelta
+
+# Time an issue waited for each metric, by the field ending the wait
+METRICS = collections.OrderedDict([
+    ('time_to_first_response', 'firstResponseAt'),
+    ('time_to_close', 'closedAt'),
+    ('review_latency', 'firstReviewAt'),
+])
+
+QUANTILES = (
+    ('p50', 0.5),
+    ('p90', 0.9),
+    ('p99', 0.99),
+)
+
+
+class QuantileSketch():
+    """
+    A mergeable sketch of a distribution of non-negative values.
+
+    Values are counted in buckets growing geometrically, so that any
+    quantile is answered within the relative accuracy, and the number of
+    buckets is logarithmic in the range of the values: about a thousand
+    for durations from a second to ten years at 1%.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        """
+        Constructs a new ``QuantileSketch``
+
+        :param relative_accuracy: Relative error of the quantiles.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = collections.Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[self._index(value)] += 1
+
+    def remove(self, value):
+        """Remove a value added earlier."""
+        self.count -= 1
+        if value <= 0:
+            self.zeros -= 1
+        else:
+            index = self._index(value)
+            self.buckets[index] -= 1
+            if not self.buckets[index]:
+                del self.buckets[index]
+
+    def merge(self, other):
+        """Add the values counted by another sketch of the same accuracy.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches of different accuracy')
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        """
+        :return: The ``q`` quantile of the values, or None if there are
+                 none.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                break
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def to_data(self):
+        """
+        :return: JSON serializable counts, for ``from_data``.
+        """
+        return [self.zeros, dict(self.buckets)]
+
+    @classmethod
+    def from_data(cls, data):
+        sketch = cls()
+        sketch.zeros, buckets = data
+        sketch.buckets.update(dict(
+            (int(index), count) for index, count in buckets.items()))
+        sketch.count = sketch.zeros + sum(sketch.buckets.values())
+        return sketch
+
+
+def get_window_start(date, window):
+    """
+    :return: The first day of the oldest unit of the ``Window``.
+    """
+    day = datetime.date(date.year, date.month, date.day)
+    if window.unit == 'month':
+        return day.replace(day=1) - relativedelta.relativedelta(
+            months=window.count - 1)
+    elif window.unit == 'week':
+        return day - datetime.timedelta(days=day.weekday()
+                                        + 7 * (window.count - 1))
+    return day - datetime.timedelta(days=window.count - 1)
+
+
+def parse_time(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        return parser.parse(value, ignoretz=True)
+
+
+def get_waits(issue):
+    """
+    :param issue: Github API Parsed JSON issue
+    :return: List of the metric, the day the wait ended and the seconds
+             waited, of each metric of the issue.
+    """
+    issue = issue['issue']
+    waits = []
+    for metric, field in METRICS.items():
+        ended = issue.get(field)
+        if not ended:
+            continue
+        waited = parse_time(ended) - parse_time(issue['createdAt'])
+        waits.append([metric, ended[:10], waited.total_seconds()])
+    return waits
+
+
+class HealthMetrics():
+    """
+    Distributions of the time issues waited, for each metric, of those
+    whose wait ended in each window.
+
+    The waits are kept in a sketch for each metric and day, so that the
+    metrics can be saved with ``to_data`` and updated on later days.
+    Metrics of disjoint sets of issues, e.g. of repositories processed in
+    parallel, are combined with ``merge``.
+    """
+
+    def __init__(self, date, windows, data=None):
+        """
+        Constructs a new ``HealthMetrics``
+
+        :param date: The date windows end at.
+        :param windows: ``Window`` tuples to collect the metrics of.
+        :param data: Metrics saved by ``to_data``.
+        """
+        self.windows = windows
+        self.end = date.strftime('%Y-%m-%d')
+        self.starts = [get_window_start(date, window).isoformat()
+                       for window in windows]
+        # Waits before the start of the longest window are not kept
+        self.start = min(self.starts)
+        self.sketches = collections.defaultdict(dict)
+        for metric, days in (data or {}).items():
+            for day, sketch in days.items():
+                if day >= self.start:
+                    self.sketches[metric][day] = QuantileSketch.from_data(
+                        sketch)
+
+    def add(self, waits, sign=1):
+        """
+        Add waits from ``get_waits``, or remove them if ``sign`` is -1.
+        """
+        for metric, day, seconds in waits:
+            if day < self.start:
+                continue
+            sketches = self.sketches[metric]
+            if day not in sketches:
+                sketches[day] = QuantileSketch()
+            if sign > 0:
+                sketches[day].add(seconds)
+            else:
+                sketches[day].remove(seconds)
+                if not sketches[day].count:
+                    del sketches[day]
+
+    def add_issue(self, issue):
+        """
+        :param issue: Github API Parsed JSON issue
+        """
+        self.add(get_waits(issue))
+
+    def merge(self, other):
+        for metric, days in other.sketches.items():
+            for day, sketch in days.items():
+                if day not in self.sketches[metric]:
+                    self.sketches[metric][day] = QuantileSketch()
+                self.sketches[metric][day].merge(sketch)
+
+    def to_data(self):
+        """
+        :return: JSON serializable metrics, for the ``data`` argument.
+        """
+        return dict((metric, dict((day, sketch.to_data())
+                                  for day, sketch in days.items()))
+                    for metric, days in self.sketches.items() if days)
+
+    def get_data(self):
+        """
+        :return: Dict of window name to metric to the count and quantiles
+                 in seconds of the waits. Metrics without any wait in the
+                 window are left out.
+        """
+        data = {}
+        for window, start in zip(self.windows, self.starts):
+            data[window.name] = {}
+            for metric in METRICS:
+                sketch = QuantileSketch()
+                for day, day_sketch in self.sketches[metric].items():
+                    if start <= day <= self.end:
+                        sketch.merge(day_sketch)
+                if not sketch.count:
+                    continue
+                data[window.name][metric] = dict(
+                    (name, round(sketch.quantile(q)))
+                    for name, q in QUANTILES)
+                data[window.name][metric]['count'] = sketch.count
+        return data
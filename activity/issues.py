@@ -0,0 +1,202 @@
+import concurrent.futures
+import json
+import logging
+import os
+import tempfile
+
+from IGitt.GitHub.GitHub import GitHub
+from IGitt.Interfaces import get
+
+from community.git import get_remote_url, get_token
+
+STORE_VERSION = 1
+
+# Number of repositories fetched at the same time
+WORKERS = 4
+
+
+def new_store():
+    return {
+        'version': STORE_VERSION,
+        # Latest updated_at of the issues fetched from each repository
+        'synced': {},
+        # Issues in the gh-board format, by repository and number
+        'issues': {},
+    }
+
+
+def load_store(path):
+    """
+    :return: Issues saved by ``save_store``, or a new store if there are
+             none.
+    """
+    try:
+        with open(path) as f:
+            store = json.load(f)
+    except (IOError, ValueError):
+        return new_store()
+    if store.get('version') != STORE_VERSION:
+        return new_store()
+    return store
+
+
+def save_store(store, path):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(store, f)
+    os.replace(tmp_path, path)
+
+
+def to_board_issue(slug, data):
+    """
+    Convert an issue of the GitHub API to the format of gh-board.
+    """
+    owner, name = slug.split('/', 1)
+    return {
+        'repoOwner': owner,
+        'repoName': name,
+        'issue': {
+            'number': data['number'],
+            'title': data['title'],
+            'state': data['state'],
+            'createdAt': data['created_at'],
+            'updatedAt': data['updated_at'],
+            'closedAt': data['closed_at'],
+            'user': {'login': data['user']['login']},
+            'assignees': [{'login': assignee['login']}
+                          for assignee in data.get('assignees') or []],
+            'labels': [{'name': label['name']}
+                       for label in data.get('labels') or []],
+        },
+    }
+
+
+def get_org_repos(token, org):
+    """
+    :return: Full names of the repositories of the GitHub org or user.
+    """
+    url = GitHub.absolute_url('/users/%s/repos' % org)
+    return sorted(repo['full_name'] for repo in get(token, url))
+
+
+def fetch(token, path, since=None, **params):
+    """
+    Fetch a list of the GitHub API, following all pages.
+
+    :param since: Only fetch items updated at or after this time.
+    """
+    params['per_page'] = 100
+    if since:
+        params['since'] = since
+    return get(token, GitHub.absolute_url(path), params)
+
+
+def fetch_updates(token, slug, since=None, reviewed=()):
+    """
+    :param reviewed: Numbers of the pull requests whose first review is
+                     already known, whose reviews are not fetched again.
+    :return: Issues and pull requests and their comments updated at or
+             after ``since``, and the reviews of those pull requests.
+    """
+    issues = fetch(token, '/repos/%s/issues' % slug, since, state='all')
+    comments = fetch(token, '/repos/%s/issues/comments' % slug, since)
+    reviews = []
+    for issue in issues:
+        if 'pull_request' in issue and issue['number'] not in reviewed:
+            reviews.extend(fetch(token, '/repos/%s/pulls/%d/reviews'
+                                 % (slug, issue['number'])))
+    return issues, comments, reviews
+
+
+def get_reviewed(store, slug):
+    """
+    :return: Numbers of the pull requests of the repository in the store
+             with a first review.
+    """
+    prefix = slug + '#'
+    return set(int(key[len(prefix):])
+               for key, issue in store['issues'].items()
+               if key.startswith(prefix)
+               and issue['issue'].get('firstReviewAt'))
+
+
+def add_response(store, slug, field, url, login, created_at):
+    """
+    Record the time of a comment or review in the field of its issue, if
+    it is the earliest one by someone other than the author.
+
+    :param url: API URL of the issue, ending with its number.
+    """
+    issue = store['issues'].get('%s#%s' % (slug, url.rsplit('/', 1)[1]))
+    if not issue:
+        return
+    issue = issue['issue']
+    if login == issue['user']['login']:
+        return
+    if not issue.get(field) or created_at < issue[field]:
+        issue[field] = created_at
+
+
+def sync_issues(org, store):
+    """
+    Fetch the issues of all repositories of the org updated since the
+    last sync into the store, with the time of their first response and
+    of the first review of pull requests.
+
+    A repository which fails to be fetched keeps its earlier issues, and
+    is fetched from the same time on the next sync.
+
+    :param org:   GitHub org name.
+    :param store: Store from ``load_store``, updated in place.
+    :return:      Number of issues fetched.
+    :raises RuntimeError: If the repository is not hosted on GitHub.
+    """
+    logger = logging.getLogger(__name__)
+    url = get_remote_url()
+    if url.resource != 'github.com':
+        raise RuntimeError('Issues can only be synced from GitHub, not %s'
+                           % url.resource)
+    token = get_token(url)
+    synced = store['synced']
+    count = 0
+
+    with concurrent.futures.ThreadPoolExecutor(WORKERS) as executor:
+        futures = dict(
+            (executor.submit(fetch_updates, token, slug, synced.get(slug),
+                             get_reviewed(store, slug)),
+             slug)
+            for slug in get_org_repos(token, org))
+        for future in concurrent.futures.as_completed(futures):
+            slug = futures[future]
+            try:
+                issues, comments, reviews = future.result()
+            except Exception as ex:
+                logger.error('Unable to fetch issues of %s: %s' % (slug, ex))
+                continue
+
+            for data in issues:
+                key = '%s#%s' % (slug, data['number'])
+                issue = to_board_issue(slug, data)
+                previous = store['issues'].get(key)
+                for field in ('firstResponseAt', 'firstReviewAt'):
+                    if previous and previous['issue'].get(field):
+                        issue['issue'][field] = previous['issue'][field]
+                store['issues'][key] = issue
+                synced[slug] = max(synced.get(slug, ''), data['updated_at'])
+            for comment in comments:
+                add_response(store, slug, 'firstResponseAt',
+                             comment['issue_url'], comment['user']['login'],
+                             comment['created_at'])
+            for review in reviews:
+                # Pending reviews are not submitted yet
+                if review.get('submitted_at'):
+                    add_response(store, slug, 'firstReviewAt',
+                                 review['pull_request_url'],
+                                 review['user']['login'],
+                                 review['submitted_at'])
+            count += len(issues)
+
+    logger.info('Fetched %d updated issues of %s' % (count, org))
+    return count
@@ -1,155 +1,458 @@
-import requests
+import collections
 import json
 import datetime
 import calendar
 import logging
+import os
+import tempfile
 
-from dateutil import parser, relativedelta
+import numpy
+from dateutil import relativedelta
+from django.conf import settings
 from django.http import HttpResponse
 
+from activity.health import (
+    METRICS, HealthMetrics, get_waits, get_window_start)
+from activity.issues import load_store, save_store, sync_issues
 from community.git import get_org_name
+from community.httpcache import CHUNK_SIZE, cached_get
+from community.jsonstream import iter_json_array
 
+STATE_VERSION = 6
 
-class Scraper():
+# A histogram of the last ``count`` months, weeks or days
+Window = collections.namedtuple('Window', ['name', 'unit', 'count'])
+
+WINDOWS = (
+    Window('year', 'month', 12),
+    Window('month', 'week', 4),
+    Window('week', 'day', 7),
+)
+
+
+def get_repo(issue):
+    return ['%s/%s' % (issue['repoOwner'], issue['repoName'])]
+
+
+def get_labels(issue):
+    return [label['name'] for label in issue['issue'].get('labels') or []]
+
+
+def get_author(issue):
+    user = issue['issue'].get('user')
+    return [user['login']] if user else []
+
+
+def get_assignees(issue):
+    return [assignee['login']
+            for assignee in issue['issue'].get('assignees') or []]
+
+
+# Breakdowns of the activity, each listing the groups an issue is in
+DIMENSIONS = collections.OrderedDict([
+    ('repo', get_repo),
+    ('label', get_labels),
+    ('author', get_author),
+    ('assignee', get_assignees),
+])
+
+# Group of all issues
+TOTAL = ''
+
+
+def new_state(dimensions=tuple(DIMENSIONS)):
     """
-    This is the class responsible for scraping provided issues into a
-    dictionary containing just statistical information of the data.
+    :return: Counters of a scrape of no issues.
     """
+    return {
+        'version': STATE_VERSION,
+        'dimensions': list(dimensions),
+        # Opened and closed issues of each group by creation day
+        'days': {},
+        # Names of the groups, indexed by the issues
+        'groups': [],
+        # Whether each counted issue is closed, its creation day, the
+        # indices of its groups and its waits for the health metrics
+        'issues': {},
+        # Health metrics of each repository
+        'health': {},
+        # Latest update of the counted issues of each repository
+        'repos': {},
+    }
 
+
+def load_state(path):
     """
-    Count of months/weeks/days respectively to be scraped in past.
+    :return: Counters saved by ``save_state``, or new ones if there are
+             none.
     """
-    CONSTANTS = {
-        'month_count': 12,
-        'week_count': 4,
-        'day_count': 7,
-    }
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (IOError, ValueError):
+        return new_state()
+    if state.get('version') != STATE_VERSION:
+        return new_state()
+    return state
+
+
+def save_state(state, path):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
 
-    def __init__(self, content, date):
+
+class Scraper():
+    """
+    This is the class responsible for scraping provided issues into a
+    dictionary containing just statistical information of the data.
+    """
+
+    def __init__(self, content, date, state=None, windows=WINDOWS,
+                 dimensions=DIMENSIONS):
         """
         Constructs a new ``Scraper``
 
-        :param content: Github API Parsed JSON issues
+        :param content: Github API Parsed JSON issues, which may be an
+                        iterator to consume them as they are parsed.
         :param date: The date to scrape data till.
+        :param state: Counters of an earlier scrape from ``load_state``.
+                      Only the issues which changed since then are
+                      counted again, and the counters are updated in
+                      place.
+        :param windows: ``Window`` histograms to count issues in.
+        :param dimensions: Dict of breakdown name to function listing the
+                           groups of an issue, each counted separately.
         """
         logger = logging.getLogger(__name__)
         logger.info('this package is alive')
 
         self.date = date
         self.content = content
+        self.windows = windows
+        self.dimensions = dimensions
+        if state is None:
+            state = new_state(dimensions)
+        elif state['dimensions'] != list(dimensions):
+            state.clear()
+            state.update(new_state(dimensions))
+        self.state = state
+        self.group_ids = dict((name, index)
+                              for index, name in enumerate(state['groups']))
+        # Issues created before the first day of the longest window are
+        # not counted, so that the state is bounded by the recent issues
+        self.start = min(get_window_start(date, window).isoformat()
+                         for window in windows)
+        # Issues of a repository updated before its latest update counted
+        # by the earlier scrape are unchanged, and need not be grouped
+        self.updated = dict(state['repos'])
+        self.health = dict(
+            (repo, HealthMetrics(date, windows, data))
+            for repo, data in state['health'].items())
 
         # Initialise data dicts
-        self.data = {
-            'year': {
-                'labels': [],
-                'closed': [0]*self.CONSTANTS['month_count'],
-                'opened': [0]*self.CONSTANTS['month_count'],
-            },
-            'month': {
-                'labels': [],
-                'closed': [0]*self.CONSTANTS['week_count'],
-                'opened': [0]*self.CONSTANTS['week_count'],
-            },
-            'week': {
-                'labels': [],
-                'closed': [0]*self.CONSTANTS['day_count'],
-                'opened': [0]*self.CONSTANTS['day_count'],
-            },
-        }
+        self.data = {}
+        for window in windows:
+            self.data[window.name] = {
+                'labels': self.__labels(window),
+                'closed': [0]*window.count,
+                'opened': [0]*window.count,
+            }
+
+    def __labels(self, window):
+        """
+        :return: Labels of the units of the window, oldest first.
+        """
+        labels = []
+        for x in range(window.count-1, -1, -1):
+            if window.unit == 'month':
+                labels.append(calendar.month_name[(
+                    self.date - relativedelta.relativedelta(months=x)).month])
+            elif window.unit == 'week':
+                day = self.date - relativedelta.relativedelta(weeks=x)
+                strt = (day - datetime.timedelta(days=day.weekday()))
+                fin = (day + datetime.timedelta(days=6-day.weekday()))
+                labels.append(
+                    calendar.month_abbr[strt.month] + ' ' + str(strt.day)
+                    + ' - '
+                    + calendar.month_abbr[fin.month] + ' ' + str(fin.day))
+            else:
+                day_idx = (self.date - datetime.timedelta(days=x)).weekday()
+                labels.append(calendar.day_name[day_idx])
+        return labels
+
+    def __diff_days(self, days):
+        """
+        :param days: Dates as a datetime64[D] array.
 
-        # Process labels for each option
-        for x in range(self.CONSTANTS['month_count']-1, -1, -1):
-            self.data['year']['labels'].append(calendar.month_name[(
-                self.date - relativedelta.relativedelta(months=x)).month])
+        :return: Differences in days ignoring partially complete days.
+        """
+        return (numpy.datetime64(self.date, 'D') - days).astype(int)
 
-        for x in range(self.CONSTANTS['week_count']-1, -1, -1):
-            day = self.date - relativedelta.relativedelta(weeks=x)
-            strt = (day - datetime.timedelta(days=day.weekday()))
-            fin = (day + datetime.timedelta(days=6-day.weekday()))
-            self.data['month']['labels'].append(
-                calendar.month_abbr[strt.month] + ' ' + str(strt.day)
-                + ' - '
-                + calendar.month_abbr[fin.month] + ' ' + str(fin.day))
+    def __diff_weeks(self, days):
+        """
+        :param days: Dates as a datetime64[D] array.
+
+        :return: Differences in weeks ignoring partially complete weeks.
+        """
+        def mondays(dates):
+            ordinals = dates.astype(int)
+            # Day 0 of datetime64 is a Thursday
+            return ordinals - (ordinals + 3) % 7
 
-        for x in range(self.CONSTANTS['day_count']-1, -1, -1):
-            day_idx = (self.date - datetime.timedelta(days=x)).weekday()
-            self.data['week']['labels'].append(calendar.day_name[day_idx])
+        today = numpy.datetime64(self.date, 'D')
+        return (mondays(today) - mondays(days)) // 7
+
+    def __diff_months(self, days):
+        """
+        :param days: Dates as a datetime64[D] array.
+
+        :return: Differences in months ignoring partially complete months.
+        """
+        month = numpy.datetime64(self.date, 'M')
+        return (month - days.astype('datetime64[M]')).astype(int)
 
-    def __diff_month(self, d):
+    def __count(self, window, groups, days, opened, closed):
         """
-        :param d: Date as datetime, self.date >= Date.
+        Count the issues of each group in the last units of the window.
 
-        :return: Difference in months(int) ignoring partially complete months.
+        :param window: The ``Window``.
+        :param groups: Array of the group index of each day.
+        :param days:   Array of days, as datetime64[D].
+        :param opened: Array of issues of the group opened on the day.
+        :param closed: Array of those issues which are closed.
+        :return:       Opened and closed arrays of shape (groups, units).
         """
-        return (self.date.year - d.year) * 12 + self.date.month - d.month
+        diffs = {
+            'month': self.__diff_months,
+            'week': self.__diff_weeks,
+            'day': self.__diff_days,
+        }[window.unit](days)
+        in_period = (diffs >= 0) & (diffs < window.count)
+        buckets = (groups[in_period] * window.count
+                   + window.count - diffs[in_period] - 1)
+        size = len(self.state['days']) * window.count
+        return [numpy.bincount(buckets, weights[in_period],
+                               minlength=size).astype(int).reshape(
+                                   -1, window.count)
+                for weights in (opened, closed)]
 
-    def __diff_week(self, d):
+    def __group_id(self, name):
+        if name not in self.group_ids:
+            self.group_ids[name] = len(self.state['groups'])
+            self.state['groups'].append(name)
+        return self.group_ids[name]
+
+    def __add(self, repo, issue, sign=1):
+        """
+        Add an issue from the state to the counters of its groups and to
+        the health metrics of its repository, or remove it if ``sign`` is
+        -1.
         """
-        :param d: Date as datetime, self.date >= Date.
+        closed, day, group_ids, waits = issue
+        if repo not in self.health:
+            self.health[repo] = HealthMetrics(self.date, self.windows)
+        self.health[repo].add(waits, sign)
+        if day < self.start:
+            return
+        for group_id in group_ids:
+            group = self.state['groups'][group_id]
+            counts = self.state['days'].setdefault(group, {}).setdefault(
+                day, [0, 0])
+            counts[0] += sign
+            counts[1] += sign * closed
+            if counts == [0, 0]:
+                del self.state['days'][group][day]
 
-        :return: Difference in weeks(int) ignoring partially complete weeks.
+    def __prune(self):
+        """
+        Forget the issues created and done waiting before the longest
+        window, and the groups none of the remaining issues is in.
         """
-        monday1 = (self.date - datetime.timedelta(days=self.date.weekday()))
-        monday2 = (d - datetime.timedelta(days=d.weekday()))
-        return (monday1 - monday2).days // 7
+        state = self.state
+        for key, (closed, day, group_ids, waits) in list(
+                state['issues'].items()):
+            waits[:] = [wait for wait in waits if wait[1] >= self.start]
+            if day < self.start and not waits:
+                del state['issues'][key]
+        for group in list(state['days']):
+            days = state['days'][group]
+            for day in [day for day in days if day < self.start]:
+                del days[day]
+            if not days:
+                del state['days'][group]
 
-    def __diff_days(self, d):
+        names = state['groups']
+        state['groups'] = []
+        self.group_ids = {}
+        for closed, day, group_ids, waits in state['issues'].values():
+            group_ids[:] = [self.__group_id(names[group_id])
+                            for group_id in group_ids]
+
+    def add_issues(self, issues):
         """
-        :param d: Date as datetime, self.date >= Date.
+        Add issues to the daily counters of their groups, skipping those
+        which did not change since they were counted, and to the health
+        metrics of their repository.
+
+        An issue is known to be unchanged, without grouping it again, if
+        it was updated before the latest update counted of its repository.
+        Issues of a repository not counted before, e.g. one transferred
+        into the org, are all counted whenever they were updated. Issues
+        created before the longest window are not grouped, and are only
+        kept while a wait of theirs ended in it.
 
-        :return: Difference in days(int) ignoring partially complete days.
+        :param issues: Github API Parsed JSON issues
         """
-        return (self.date-d).days
+        counted = self.state['issues']
+        repos = self.state['repos']
+        for issue in issues:
+            repo = '%s/%s' % (issue['repoOwner'], issue['repoName'])
+            updated = issue['issue'].get('updatedAt')
+            if updated:
+                if updated < self.updated.get(repo, updated):
+                    continue
+                repos[repo] = max(repos.get(repo, updated), updated)
+
+            # Keep the date, while ignoring the timestamp.
+            day = issue['issue']['createdAt'][:10]
+            waits = [wait for wait in get_waits(issue)
+                     if wait[1] >= self.start]
+            group_ids = []
+            if day >= self.start:
+                groups = sorted(set(
+                    '%s:%s' % (name, group)
+                    for name, get_groups in self.dimensions.items()
+                    for group in get_groups(issue)))
+                groups.insert(0, TOTAL)
+                group_ids = [self.__group_id(group) for group in groups]
+            elif not waits:
+                continue
+            key = '%s#%s' % (repo, issue['issue']['number'])
+            closed = int(issue['issue']['state'] == 'closed')
+            counted_issue = [closed, day, group_ids, waits]
+            previous = counted.get(key)
+            if previous == counted_issue:
+                continue
+            counted[key] = counted_issue
+
+            if previous:
+                self.__add(repo, previous, -1)
+            self.__add(repo, counted_issue)
 
     def get_data(self):
         """
         Get data
 
-        :return: Data in form of dict containing year, month, week data.
-        """
-        for issue in self.content:
-            issue = issue['issue']
-            # Parse date, while ignoring the timestamp.
-            dt = parser.parse(issue['createdAt'][:10])
-
-            mon = self.__diff_month(dt)
-            if mon < self.CONSTANTS['month_count']:
-                mon = self.CONSTANTS['month_count'] - mon - 1
-                self.data['year']['opened'][mon] += 1
-                if issue['state'] == 'closed':
-                    self.data['year']['closed'][mon] += 1
-
-            wk = self.__diff_week(dt)
-            if wk < self.CONSTANTS['week_count']:
-                wk = self.CONSTANTS['week_count'] - wk - 1
-                self.data['month']['opened'][wk] += 1
-                if issue['state'] == 'closed':
-                    self.data['month']['closed'][wk] += 1
-
-            dys = self.__diff_days(dt)
-            if dys < self.CONSTANTS['day_count']:
-                dys = self.CONSTANTS['day_count'] - dys - 1
-                self.data['week']['opened'][dys] += 1
-                if issue['state'] == 'closed':
-                    self.data['week']['closed'][dys] += 1
+        :return: Data in form of dict containing year, month, week data,
+                 the data of each group of each dimension, and the
+                 health metrics in total and of each repository, with
+                 the metrics no issue has a wait for as unavailable.
+        """
+        self.add_issues(self.content)
+        self.__prune()
+
+        names = list(self.state['days'])
+        groups = []
+        days = []
+        counts = []
+        for index, name in enumerate(names):
+            group_days = self.state['days'][name]
+            groups += [index] * len(group_days)
+            days += group_days
+            counts += group_days.values()
+        groups = numpy.array(groups, dtype=int)
+        days = numpy.array(days, dtype='datetime64[D]')
+        counts = numpy.array(counts, dtype=int).reshape(-1, 2)
+
+        counted = [self.__count(window, groups, days,
+                                counts[:, 0], counts[:, 1])
+                   for window in self.windows]
+        for dimension in self.dimensions:
+            self.data[dimension] = {}
+        for index, name in enumerate(names):
+            if not any(opened[index].any() for opened, _ in counted):
+                continue
+            if name != TOTAL:
+                dimension, group = name.split(':', 1)
+                self.data[dimension][group] = {}
+            for window, (opened, closed) in zip(self.windows, counted):
+                if name == TOTAL:
+                    data = self.data[window.name]
+                else:
+                    data = self.data[dimension][group][window.name] = {}
+                data['opened'] = opened[index].tolist()
+                data['closed'] = closed[index].tolist()
+
+        self.state['health'] = {}
+        total = HealthMetrics(self.date, self.windows)
+        for repo, health in self.health.items():
+            data = health.to_data()
+            if data:
+                self.state['health'][repo] = data
+            total.merge(health)
+        total_data = total.get_data()
+        self.data['health'] = {
+            'total': total_data,
+            'repo': dict((repo, self.health[repo].get_data())
+                         for repo in self.state['health']),
+            'unavailable': [metric for metric in METRICS
+                            if not any(metric in data
+                                       for data in total_data.values())],
+        }
 
         return self.data
 
 
-def activity_json(request):
+def get_github_data(org_name, state):
+    """
+    Scrape the issues of the org synced from the GitHub API.
+    """
+    store = load_store(settings.ACTIVITY_ISSUES_FILE)
+    sync_issues(org_name, store)
+    save_store(store, settings.ACTIVITY_ISSUES_FILE)
 
-    org_name = get_org_name()
+    scraper = Scraper(store['issues'].values(), datetime.datetime.today(),
+                      state)
+    return scraper.get_data()
 
+
+def get_board_data(org_name, state):
+    """
+    Scrape the issues of the org dumped by gh-board.
+
+    :return: The data, or None if the dump is not valid JSON.
+    """
     # URL to grab all issues from
     issues_url = 'http://' + org_name + '.github.io/gh-board/issues.json'
 
-    content = requests.get(issues_url)
+    # Issues are counted as they are parsed, without loading them all
+    content = cached_get(issues_url, stream=True)
     try:
-        parsed_json = content.json()
+        issues = iter_json_array(content.iter_content(CHUNK_SIZE), 'issues')
+        scraper = Scraper(issues, datetime.datetime.today(), state)
+        return scraper.get_data()
     except json.JSONDecodeError:
+        return None
+    finally:
+        content.close()
+
+
+def activity_json(request):
+
+    org_name = get_org_name()
+
+    state = load_state(settings.ACTIVITY_STATE_FILE)
+    if settings.ACTIVITY_SOURCE == 'github':
+        real_data = get_github_data(org_name, state)
+    else:
+        real_data = get_board_data(org_name, state)
+    if real_data is None:
         return HttpResponse('{}')
 
-    real_data = Scraper(parsed_json['issues'], datetime.datetime.today())
-    real_data = real_data.get_data()
+    save_state(state, settings.ACTIVITY_STATE_FILE)
 
     return HttpResponse(json.dumps(real_data))
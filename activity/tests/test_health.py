@@ -0,0 +1,82 @@
+import datetime
+import json
+import random
+
+from django.test import SimpleTestCase
+
+from activity.health import HealthMetrics, QuantileSketch
+from activity.scraper import Window
+
+
+class QuantileSketchTest(SimpleTestCase):
+
+    def test_quantiles(self):
+        rand = random.Random(0)
+        values = [rand.expovariate(1 / 3600) for _ in range(10000)]
+        first = QuantileSketch()
+        second = QuantileSketch()
+        for value in values[:5000]:
+            first.add(value)
+        for value in values[5000:]:
+            second.add(value)
+        first.merge(second)
+
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(first.quantile(q), expected,
+                                   delta=expected * 0.011)
+        self.assertLess(len(first.buckets), 1000)
+
+    def test_remove(self):
+        sketch = QuantileSketch()
+        for value in (0, 60, 3600):
+            sketch.add(value)
+        sketch.remove(3600)
+        sketch.remove(0)
+        self.assertEqual(sketch.count, 1)
+        self.assertEqual(sketch.zeros, 0)
+        self.assertEqual(len(sketch.buckets), 1)
+        self.assertAlmostEqual(sketch.quantile(0.5), 60, delta=0.6)
+
+
+class HealthMetricsTest(SimpleTestCase):
+
+    def test_windows(self):
+        health = HealthMetrics(datetime.datetime(2018, 7, 4),
+                               [Window('week', 'day', 7)])
+        health.add_issue({'issue': {
+            'createdAt': '2018-07-01T00:00:00Z',
+            'closedAt': '2018-07-02T00:00:00Z',
+            'firstResponseAt': '2018-07-01T01:00:00Z',
+        }})
+        health.add_issue({'issue': {
+            'createdAt': '2018-06-01T00:00:00Z',
+            'closedAt': '2018-06-02T00:00:00Z',
+        }})
+
+        data = health.get_data()['week']
+        self.assertEqual(sorted(data),
+                         ['time_to_close', 'time_to_first_response'])
+        self.assertEqual(data['time_to_close']['count'], 1)
+        self.assertAlmostEqual(data['time_to_close']['p50'], 86400,
+                               delta=864)
+        self.assertAlmostEqual(data['time_to_first_response']['p99'], 3600,
+                               delta=36)
+
+    def test_saved(self):
+        date = datetime.datetime(2018, 7, 4)
+        windows = [Window('week', 'day', 7)]
+        health = HealthMetrics(date, windows)
+        health.add_issue({'issue': {
+            'createdAt': '2018-07-01T00:00:00Z',
+            'closedAt': '2018-07-02T00:00:00Z',
+        }})
+        data = json.loads(json.dumps(health.to_data()))
+        self.assertEqual(list(data['time_to_close']), ['2018-07-02'])
+
+        saved = HealthMetrics(date, windows, data)
+        self.assertEqual(saved.get_data(), health.get_data())
+        # Days before the window are dropped when loaded
+        later = HealthMetrics(datetime.datetime(2018, 7, 9), windows, data)
+        self.assertEqual(later.to_data(), {})
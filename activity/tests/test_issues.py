@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from activity.issues import new_store, sync_issues
+
+
+def make_issue(number, updated_at, state='open', pull_request=False):
+    issue = {
+        'number': number,
+        'title': 'Issue %d' % number,
+        'state': state,
+        'created_at': '2018-07-01T00:00:00Z',
+        'updated_at': updated_at,
+        'closed_at': None,
+        'user': {'login': 'author'},
+        'assignees': [],
+        'labels': [{'name': 'bug'}],
+    }
+    if pull_request:
+        issue['pull_request'] = {}
+    return issue
+
+
+def make_comment(login, created_at):
+    return {
+        'issue_url': 'https://api.github.com/repos/org/a/issues/1',
+        'user': {'login': login},
+        'created_at': created_at,
+    }
+
+
+def make_review(login, submitted_at):
+    return {
+        'pull_request_url': 'https://api.github.com/repos/org/a/pulls/2',
+        'user': {'login': login},
+        'submitted_at': submitted_at,
+    }
+
+
+class SyncIssuesTest(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch('activity.issues.get_token')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('activity.issues.get_remote_url')
+        self.remote_url = patcher.start().return_value
+        self.remote_url.resource = 'github.com'
+        self.addCleanup(patcher.stop)
+
+    @mock.patch('activity.issues.get')
+    def test_gitlab(self, get):
+        self.remote_url.resource = 'gitlab.com'
+        with self.assertRaisesRegex(RuntimeError, 'not gitlab.com'):
+            sync_issues('org', new_store())
+        self.assertFalse(get.called)
+
+    @mock.patch('activity.issues.get')
+    def test_since(self, get):
+        def repo_issues(token, url, params=None):
+            if url.endswith('/users/org/repos'):
+                return [{'full_name': 'org/a'}, {'full_name': 'org/b'}]
+            if url.endswith('/repos/org/b/issues'):
+                raise RuntimeError('Not found')
+            if url.endswith('/issues/comments'):
+                return [make_comment('author', '2018-07-01T01:00:00Z'),
+                        make_comment('mentor', '2018-07-01T03:00:00Z'),
+                        make_comment('mentor', '2018-07-01T02:00:00Z')]
+            if url.endswith('/pulls/2/reviews'):
+                return [make_review('author', '2018-07-02T01:00:00Z'),
+                        make_review('mentor', None),
+                        make_review('mentor', '2018-07-02T03:00:00Z')]
+            if params.get('since'):
+                return [make_issue(1, '2018-07-03T00:00:00Z', 'closed'),
+                        make_issue(2, '2018-07-03T00:00:00Z',
+                                   pull_request=True)]
+            return [make_issue(1, '2018-07-01T00:00:00Z'),
+                    make_issue(2, '2018-07-02T00:00:00Z',
+                               pull_request=True)]
+        get.side_effect = repo_issues
+
+        store = new_store()
+        self.assertEqual(sync_issues('org', store), 2)
+        self.assertEqual(store['synced'], {'org/a': '2018-07-02T00:00:00Z'})
+        self.assertEqual(sync_issues('org', store), 2)
+
+        params = [call[0][2] for call in get.call_args_list
+                  if call[0][1].endswith('/repos/org/a/issues')]
+        self.assertEqual(params[-1]['since'], '2018-07-02T00:00:00Z')
+        self.assertEqual(sorted(store['issues']), ['org/a#1', 'org/a#2'])
+        issue = store['issues']['org/a#1']
+        self.assertEqual(issue['repoName'], 'a')
+        self.assertEqual(issue['issue']['state'], 'closed')
+        self.assertEqual(issue['issue']['labels'], [{'name': 'bug'}])
+        self.assertEqual(issue['issue']['firstResponseAt'],
+                         '2018-07-01T02:00:00Z')
+        self.assertNotIn('firstReviewAt', issue['issue'])
+        self.assertEqual(store['issues']['org/a#2']['issue']['firstReviewAt'],
+                         '2018-07-02T03:00:00Z')
+        # The reviews of a reviewed pull request are not fetched again
+        reviews = [call for call in get.call_args_list
+                   if call[0][1].endswith('/reviews')]
+        self.assertEqual(len(reviews), 1)
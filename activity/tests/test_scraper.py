@@ -0,0 +1,186 @@
+import collections
+import datetime
+
+from django.test import SimpleTestCase
+
+from activity.scraper import DIMENSIONS, Scraper, Window
+
+
+def make_issue(created_at, state='open', number=1, updated_at=None,
+               labels=(), repo='repo', closed_at=None):
+    return {
+        'repoOwner': 'org',
+        'repoName': repo,
+        'issue': {
+            'number': number,
+            'createdAt': created_at,
+            'updatedAt': updated_at or created_at,
+            'state': state,
+            'user': {'login': 'author'},
+            'assignees': [],
+            'labels': [{'name': label} for label in labels],
+            'closedAt': closed_at,
+        },
+    }
+
+
+class ScraperTest(SimpleTestCase):
+
+    def test_get_data(self):
+        # A Wednesday
+        date = datetime.datetime(2018, 7, 4, 12)
+        data = Scraper([
+            make_issue('2018-07-04T08:00:00Z', number=1),
+            make_issue('2018-07-01T23:00:00Z', 'closed', number=2),
+            make_issue('2017-08-15T00:00:00Z', 'closed', number=3),
+            make_issue('2017-07-31T00:00:00Z', number=4),
+        ], date).get_data()
+
+        self.assertEqual(data['year']['opened'], [1] + [0] * 10 + [2])
+        self.assertEqual(data['year']['closed'], [1] + [0] * 10 + [1])
+        self.assertEqual(data['year']['labels'][-1], 'July')
+        self.assertEqual(data['month']['opened'], [0, 0, 1, 1])
+        self.assertEqual(data['month']['closed'], [0, 0, 1, 0])
+        self.assertEqual(data['month']['labels'][-1], 'Jul 2 - Jul 8')
+        self.assertEqual(data['week']['opened'], [0, 0, 0, 1, 0, 0, 1])
+        self.assertEqual(data['week']['closed'], [0, 0, 0, 1, 0, 0, 0])
+        self.assertEqual(data['week']['labels'][-1], 'Wednesday')
+
+    def test_incremental(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        issues = [
+            make_issue('2018-07-02T08:00:00Z', number=1, labels=['bug']),
+            make_issue('2018-07-03T08:00:00Z', number=2),
+        ]
+        scraper = Scraper(issues, date)
+        scraper.get_data()
+
+        issues = [
+            make_issue('2018-07-02T08:00:00Z', 'closed', number=1,
+                       updated_at='2018-07-04T09:00:00Z',
+                       labels=['feature'],
+                       closed_at='2018-07-04T08:00:00Z'),
+            issues[1],
+            make_issue('2018-07-04T08:00:00Z', number=3),
+        ]
+        data = Scraper(issues, date, scraper.state).get_data()
+        self.assertEqual(data, Scraper(issues, date).get_data())
+        self.assertEqual(data['week']['opened'], [0, 0, 0, 0, 1, 1, 1])
+        self.assertEqual(data['week']['closed'], [0, 0, 0, 0, 1, 0, 0])
+        self.assertEqual(sorted(scraper.state['issues']),
+                         ['org/repo#1', 'org/repo#2', 'org/repo#3'])
+        self.assertEqual(data['health']['total']['week']['time_to_close'],
+                         data['health']['repo']['org/repo']['week'][
+                             'time_to_close'])
+        self.assertEqual(
+            data['health']['total']['week']['time_to_close']['count'], 1)
+        self.assertEqual(data['health']['unavailable'],
+                         ['time_to_first_response', 'review_latency'])
+
+        # Reopening the issue removes its wait from the saved metrics
+        issues[0] = make_issue('2018-07-02T08:00:00Z', number=1,
+                               updated_at='2018-07-04T10:00:00Z')
+        data = Scraper(issues, date, scraper.state).get_data()
+        self.assertEqual(data, Scraper(issues, date).get_data())
+        self.assertEqual(scraper.state['health'], {})
+        self.assertEqual(data['health']['repo'], {})
+        self.assertEqual(len(data['health']['unavailable']), 3)
+
+    def test_unchanged_not_grouped(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        issues = [
+            make_issue('2018-07-02T08:00:00Z', number=1),
+            make_issue('2018-07-03T08:00:00Z', number=2),
+        ]
+        scraper = Scraper(issues, date)
+        scraper.get_data()
+        self.assertEqual(scraper.state['repos'],
+                         {'org/repo': '2018-07-03T08:00:00Z'})
+
+        grouped = []
+
+        def get_repo(issue):
+            grouped.append(issue['issue']['number'])
+            return DIMENSIONS['repo'](issue)
+        dimensions = collections.OrderedDict(DIMENSIONS, repo=get_repo)
+        issues[1] = make_issue('2018-07-03T08:00:00Z', 'closed', number=2,
+                               updated_at='2018-07-04T09:00:00Z')
+        data = Scraper(issues, date, scraper.state,
+                       dimensions=dimensions).get_data()
+        self.assertEqual(grouped, [2])
+        self.assertEqual(data['week']['closed'], [0, 0, 0, 0, 0, 1, 0])
+
+    def test_old_issues_forgotten(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        issues = [
+            make_issue('2017-07-31T00:00:00Z', number=1, labels=['old']),
+            make_issue('2017-08-15T00:00:00Z', number=2, labels=['bug']),
+        ]
+        scraper = Scraper(issues, date)
+        scraper.get_data()
+        self.assertEqual(list(scraper.state['issues']), ['org/repo#2'])
+        self.assertEqual(scraper.state['groups'],
+                         ['', 'author:author', 'label:bug', 'repo:org/repo'])
+
+        # A month later the second issue left the year window too
+        date = datetime.datetime(2018, 8, 4, 12)
+        issues.append(make_issue('2018-08-01T00:00:00Z', number=3))
+        data = Scraper(issues, date, scraper.state).get_data()
+        self.assertEqual(data, Scraper(issues, date).get_data())
+        self.assertEqual(data['year']['opened'], [0] * 11 + [1])
+        self.assertEqual(list(scraper.state['issues']), ['org/repo#3'])
+        self.assertEqual(scraper.state['groups'],
+                         ['', 'author:author', 'repo:org/repo'])
+        self.assertEqual(scraper.state['days'], dict(
+            (group, {'2018-08-01': [1, 0]})
+            for group in scraper.state['groups']))
+
+    def test_old_issue_closed(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        issues = [make_issue('2016-07-04T08:00:00Z', 'closed',
+                             closed_at='2018-07-03T08:00:00Z',
+                             labels=['old'])]
+        scraper = Scraper(issues, date)
+        data = scraper.get_data()
+        # Only counted in the health metrics
+        self.assertEqual(scraper.state['issues'], {'org/repo#1': [
+            1, '2016-07-04', [], [['time_to_close', '2018-07-03',
+                                   62985600.0]]]})
+        self.assertEqual(data['label'], {})
+        self.assertEqual(
+            data['health']['total']['week']['time_to_close']['count'], 1)
+
+    def test_new_repo_with_old_issue(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        issues = [make_issue('2018-07-03T08:00:00Z', number=1)]
+        scraper = Scraper(issues, date)
+        scraper.get_data()
+
+        # A repository transferred into the org brings in an issue last
+        # updated before those already counted
+        issues.append(make_issue('2018-07-02T08:00:00Z', number=1,
+                                 repo='moved'))
+        data = Scraper(issues, date, scraper.state).get_data()
+        self.assertEqual(data, Scraper(issues, date).get_data())
+        self.assertEqual(data['week']['opened'], [0, 0, 0, 0, 1, 1, 0])
+        self.assertEqual(sorted(data['repo']), ['org/moved', 'org/repo'])
+
+    def test_dimensions(self):
+        date = datetime.datetime(2018, 7, 4, 12)
+        data = Scraper([
+            make_issue('2018-07-03T08:00:00Z', number=1,
+                       labels=['bug', 'feature']),
+            make_issue('2018-07-04T08:00:00Z', 'closed', number=2,
+                       labels=['bug']),
+            make_issue('2016-07-04T08:00:00Z', number=3, labels=['old']),
+        ], date, windows=[Window('days', 'day', 2)]).get_data()
+
+        self.assertEqual(data['days']['opened'], [1, 1])
+        self.assertEqual(data['label'], {
+            'bug': {'days': {'opened': [1, 1], 'closed': [0, 1]}},
+            'feature': {'days': {'opened': [1, 0], 'closed': [0, 0]}},
+        })
+        self.assertEqual(data['repo']['org/repo'], {
+            'days': {'opened': [1, 1], 'closed': [0, 1]}})
+        self.assertEqual(list(data['author']), ['author'])
+        self.assertEqual(data['assignee'], {})
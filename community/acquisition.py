@@ -0,0 +1,140 @@
+import collections
+import concurrent.futures
+import functools
+import logging
+import os.path
+import threading
+
+from django.conf import settings
+
+from data import contrib_data
+from gci.config import dump_cache
+from gci.students import clear_checkpoint, fetch_instances, fetch_tasks
+from openhub import (
+    affiliated_committers,
+    organization,
+    outside_committers,
+    outside_projects,
+    portfolio_projects,
+)
+from openhub.data import get_data
+
+# A data source. ``fetch`` is called in a worker thread and returns the
+# records, ``import_data`` is called for each of them in the writer.
+Source = collections.namedtuple('Source', [
+    'name',
+    'host',
+    'fetch',
+    'import_data',
+])
+
+# Number of sources which may be fetched at the same time from a host
+HOST_LIMITS = {
+    'webservices': 1,
+    'openhub': 2,
+    'gci': 2,
+}
+
+
+def get_contributors():
+    return contrib_data.get_contrib_data() or []
+
+
+def get_organization():
+    return [organization.get_organization_data()]
+
+
+SOURCES = (
+    Source('contributors', 'webservices',
+           get_contributors, contrib_data.import_data),
+    Source('organization', 'openhub',
+           get_organization, organization.import_data),
+    Source('affiliated_committers', 'openhub',
+           functools.partial(get_data, 'affiliated_committers'),
+           affiliated_committers.import_data),
+    Source('outside_committers', 'openhub',
+           functools.partial(get_data, 'outside_committers'),
+           outside_committers.import_data),
+    Source('outside_projects', 'openhub',
+           functools.partial(get_data, 'outside_projects'),
+           outside_projects.import_data),
+    Source('portfolio_projects', 'openhub',
+           functools.partial(get_data, 'projects'),
+           portfolio_projects.import_data),
+)
+
+
+def _get_gci_checkpoint_dir(name):
+    return os.path.join(settings.GCI_CHECKPOINT_DIR, name)
+
+
+def _dump_gci_data(data, name, directory):
+    """Write the GCI data, and discard the pages saved while fetching it."""
+    dump_cache(data, name + '.yaml', directory)
+    clear_checkpoint(_get_gci_checkpoint_dir(name))
+
+
+def get_gci_sources(output_dir):
+    """Sources writing the GCI tasks and instances into ``output_dir``.
+
+    They resume from the pages saved by an interrupted fetch, in the same
+    checkpoints as the ``fetch_gci_task_data`` command.
+    """
+    return (
+        Source('gci_tasks', 'gci',
+               lambda: [fetch_tasks(
+                   checkpoint_dir=_get_gci_checkpoint_dir('tasks'))],
+               functools.partial(_dump_gci_data, name='tasks',
+                                 directory=output_dir)),
+        Source('gci_instances', 'gci',
+               lambda: [fetch_instances(
+                   checkpoint_dir=_get_gci_checkpoint_dir('instances'))],
+               functools.partial(_dump_gci_data, name='instances',
+                                 directory=output_dir)),
+    )
+
+
+def _fetch(source, semaphore):
+    with semaphore:
+        return source.fetch()
+
+
+def acquire(sources=SOURCES, limits=HOST_LIMITS):
+    """Fetch all sources concurrently, and import them one at a time.
+
+    Fetching is done in threads, at most ``limits[host]`` at once for
+    each host. Records are imported in the calling thread as each source
+    completes, so only one thread writes to the database.
+
+    :return: Dict of source name to number of imported records, or None
+             if fetching or importing the source failed.
+    """
+    logger = logging.getLogger(__name__)
+    semaphores = dict((host, threading.BoundedSemaphore(limit))
+                      for host, limit in limits.items())
+    counts = {}
+
+    with concurrent.futures.ThreadPoolExecutor(len(sources)) as executor:
+        futures = dict(
+            (executor.submit(_fetch, source, semaphores[source.host]), source)
+            for source in sources)
+        for future in concurrent.futures.as_completed(futures):
+            source = futures[future]
+            try:
+                records = future.result()
+            except Exception as ex:
+                logger.error('Unable to fetch %s: %s' % (source.name, ex))
+                counts[source.name] = None
+                continue
+
+            try:
+                for record in records:
+                    source.import_data(record)
+            except Exception as ex:
+                logger.error('Unable to import %s: %s' % (source.name, ex))
+                counts[source.name] = None
+                continue
+            counts[source.name] = len(records)
+            logger.info('Imported %d %s' % (len(records), source.name))
+
+    return counts
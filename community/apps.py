@@ -0,0 +1,15 @@
+import atexit
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class CommunityConfig(AppConfig):
+    name = 'community'
+
+    def ready(self):
+        if settings.HTTP_CASSETTE:
+            from community import cassette
+            cassette.start(settings.HTTP_CASSETTE,
+                           settings.HTTP_CASSETTE_MODE)
+            atexit.register(cassette.stop)
@@ -0,0 +1,304 @@
+import collections
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.test import Client
+from django_distill.distill import urls_to_distill
+
+from activity.scraper import Scraper
+from community.distill import render_to_dir
+from data import contrib_data
+from data.models import Contributor
+from gci.students import cleanse_instances
+from gci.task import cleanse_tasks
+from openhub import data as openhub_data
+from openhub import outside_committers
+from openhub.models import ContributionsToPortfolioProject, OutsideCommitter
+
+# Number of records of each dataset at scale 1
+DATASET_SIZES = {
+    'issues': 100000,
+    'tasks': 5000,
+    'instances': 50000,
+    'contributors': 20000,
+    'committers': 10000,
+}
+
+# Views rendered by the distill benchmark, which need no network
+DISTILL_VIEWS = (
+    'community-data',
+    'community-openhub',
+    'outsidecommitters',
+    'outsidecommitter-detail',
+)
+
+# Committers per OpenHub XML page
+OPENHUB_PAGE_SIZE = 100
+
+INSTANCE_STATUSES = (
+    'CLAIMED',
+    'SUBMITTED',
+    'NEEDS_WORK',
+    'COMPLETED',
+    'ABANDONED',
+    'OUT_OF_TIME',
+)
+
+# The result of timing one benchmark at one scale
+BenchmarkResult = collections.namedtuple('BenchmarkResult', [
+    'benchmark',
+    'scale',
+    'records',
+    'seconds',
+])
+
+
+def generate_issues(count, date, seed=0, repos=20, users=500):
+    """Generate gh-board issues created in the two years before date."""
+    rand = random.Random(seed)
+    labels = ['bug', 'feature', 'documentation', 'difficulty/newcomer',
+              'status/blocked', 'type/performance']
+    issues = []
+    for number in range(1, count + 1):
+        created = date - datetime.timedelta(seconds=rand.randrange(
+            2 * 365 * 24 * 3600))
+        updated = created + datetime.timedelta(
+            seconds=rand.randrange(30 * 24 * 3600))
+        state = rand.choice(('open', 'closed'))
+        issues.append({
+            'repoOwner': 'org',
+            'repoName': 'repo%d' % rand.randrange(repos),
+            'issue': {
+                'number': number,
+                'title': 'Issue %d' % number,
+                'state': state,
+                'createdAt': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'updatedAt': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'closedAt': (updated.strftime('%Y-%m-%dT%H:%M:%SZ')
+                             if state == 'closed' else None),
+                'user': {'login': 'user%d' % rand.randrange(users)},
+                'assignees': [{'login': 'user%d' % rand.randrange(users)}
+                              for _ in range(rand.randrange(3))],
+                'labels': [{'name': label}
+                           for label in rand.sample(labels,
+                                                    rand.randrange(3))],
+            },
+        })
+    return issues
+
+
+def generate_tasks(count, seed=0):
+    rand = random.Random(seed)
+    tasks = collections.OrderedDict()
+    for task_id in range(1, count + 1):
+        tasks[task_id] = {
+            'id': task_id,
+            'name': 'Task %d' % task_id,
+            'description': 'Fix *issue* number %d' % task_id,
+            'status': rand.choice((1, 2, 2, 2)),
+            'is_beginner': rand.random() < 0.2,
+            'mentors': ['mentor%d@example.com' % rand.randrange(50)],
+            'tags': ['python', 'tag%d' % rand.randrange(20)],
+            'categories': [rand.randrange(1, 6)],
+            'external_url': ('https://github.com/org/repo/issues/%d'
+                             % task_id),
+            'last_modified': '2017-12-%02dT10:00:00Z' % rand.randrange(1, 29),
+            'max_instances': 1,
+            'time_to_complete_in_days': 3,
+        }
+    return tasks
+
+
+def generate_instances(count, task_count, seed=0):
+    rand = random.Random(seed)
+    instances = collections.OrderedDict()
+    for instance_id in range(1, count + 1):
+        student_id = rand.randrange(count // 5 + 1)
+        instances[instance_id] = {
+            'id': instance_id,
+            'task_definition_id': rand.randrange(1, task_count + 1),
+            'status': rand.choice(INSTANCE_STATUSES),
+            'student_id': student_id,
+            'student_display_name': 'Student %d' % student_id,
+            'organization_id': 1,
+            'organization_name': 'org',
+            'program_year': 2017,
+            'modified': '2017-12-01T10:00:00Z',
+            'deadline': '2017-12-04T10:00:00Z',
+        }
+    return instances
+
+
+def generate_contributors(count, seed=0):
+    rand = random.Random(seed)
+    return [{
+        'login': 'user%d' % i,
+        'name': 'User %d' % i,
+        'bio': None,
+        'contributions': rand.randrange(1000),
+        'reviews': rand.randrange(100),
+        'issues': rand.randrange(100),
+    } for i in range(count)]
+
+
+def generate_openhub_pages(count, seed=0):
+    """Generate OpenHub outside committers XML pages."""
+    rand = random.Random(seed)
+    contributor = (
+        '<contributor><name>Committer {i}</name><kudos>{kudos}</kudos>'
+        '<level>{level}</level><affiliated_with>Org {org}</affiliated_with>'
+        '<contributions_to_portfolio_projects><projects>repo{repo}'
+        '</projects><twelve_mo_commits>{commits}</twelve_mo_commits>'
+        '</contributions_to_portfolio_projects></contributor>')
+    pages = []
+    for start in range(0, count, OPENHUB_PAGE_SIZE):
+        contributors = ''.join(
+            contributor.format(i=i, kudos=rand.randrange(10),
+                               level=rand.randrange(10),
+                               org=rand.randrange(100),
+                               repo=rand.randrange(20),
+                               commits=rand.randrange(500))
+            for i in range(start, min(count, start + OPENHUB_PAGE_SIZE)))
+        pages.append(
+            ('<?xml version="1.0" encoding="UTF-8" ?><response>'
+             '<status>success</status><result><outside_committers>%s'
+             '</outside_committers></result></response>'
+             % contributors).encode())
+    return pages
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench_scraper(size):
+    date = datetime.datetime(2018, 7, 1)
+    issues = generate_issues(size('issues'), date)
+    return len(issues), timed(lambda: Scraper(issues, date).get_data())
+
+
+def bench_cleanse(size):
+    tasks = generate_tasks(size('tasks'))
+    instances = generate_instances(size('instances'), size('tasks'))
+
+    def cleanse():
+        cleanse_instances(instances, cleanse_tasks(tasks))
+    return len(instances), timed(cleanse)
+
+
+def serve_openhub_pages(pages):
+    """Patch ``openhub.data`` to serve generated pages instead of OpenHub.
+    """
+    def get(url):
+        page = int(url.rsplit('=', 1)[1])
+        return mock.Mock(content=pages[page - 1] if page <= len(pages)
+                         else b'')
+
+    return mock.patch.multiple(openhub_data, cached_get=get, OH_TOKEN='')
+
+
+def bench_openhub_parse(size):
+    pages = generate_openhub_pages(size('committers'))
+    with serve_openhub_pages(pages):
+        return size('committers'), timed(openhub_data.get_data,
+                                         'outside_committers')
+
+
+def bench_import_contributors(size):
+    contributors = generate_contributors(size('contributors'))
+    Contributor.objects.all().delete()
+    return len(contributors), timed(
+        lambda: [contrib_data.import_data(c) for c in contributors])
+
+
+def bench_import_committers(size):
+    with serve_openhub_pages(generate_openhub_pages(size('committers'))):
+        committers = openhub_data.get_data('outside_committers')
+    OutsideCommitter.objects.all().delete()
+    ContributionsToPortfolioProject.objects.all().delete()
+    return len(committers), timed(
+        lambda: [outside_committers.import_data(c) for c in committers])
+
+
+def ensure_committers(size):
+    """Import the committers of this scale, unless already imported."""
+    if OutsideCommitter.objects.count() != size('committers'):
+        bench_import_committers(size)
+    return OutsideCommitter.objects.count()
+
+
+def bench_views(size):
+    count = ensure_committers(size)
+    client = Client()
+    ids = list(OutsideCommitter.objects.values_list('id', flat=True)[:100])
+
+    def render():
+        client.get('/model/openhub/outside_committers/')
+        for pk in ids:
+            client.get('/model/openhub/outside_committer/%d/' % pk)
+    return count, timed(render)
+
+
+def bench_distill(size, processes=1):
+    count = ensure_committers(size)
+    # Importing the URLconf registers the views to distill
+    import_module(settings.ROOT_URLCONF)
+    urls = [url for url in urls_to_distill if url[2] in DISTILL_VIEWS]
+    output_dir = tempfile.mkdtemp()
+    try:
+        seconds = timed(render_to_dir, output_dir, urls,
+                        lambda message: None, processes)
+    finally:
+        shutil.rmtree(output_dir)
+    return count, seconds
+
+
+BENCHMARKS = collections.OrderedDict([
+    ('scraper', bench_scraper),
+    ('cleanse', bench_cleanse),
+    ('openhub_parse', bench_openhub_parse),
+    ('import_contributors', bench_import_contributors),
+    ('import_committers', bench_import_committers),
+    ('views', bench_views),
+    ('distill', bench_distill),
+])
+
+
+def run_benchmarks(scales, names=None, processes=1):
+    """Run the benchmarks at each scale.
+
+    The database must be a disposable one, as it is filled with
+    synthetic rows.
+
+    :param scales: Factors applied to ``DATASET_SIZES``.
+    :param names:  Names of the benchmarks to run, all if None.
+    :return: Generator of ``BenchmarkResult``.
+    """
+    for scale in scales:
+        def size(dataset):
+            return max(1, int(DATASET_SIZES[dataset] * scale))
+
+        for name, benchmark in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            if name == 'distill':
+                records, seconds = benchmark(size, processes)
+            else:
+                records, seconds = benchmark(size)
+            yield BenchmarkResult(name, scale, records, seconds)
+
+
+def get_environment():
+    return {
+        'cpus': os.cpu_count(),
+        'time': datetime.datetime.utcnow().isoformat(),
+    }
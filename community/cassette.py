@@ -0,0 +1,187 @@
+import base64
+import collections
+import contextlib
+import fcntl
+import gzip
+import json
+import logging
+import re
+import shutil
+import tempfile
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from community import httpcache
+
+CASSETTE_VERSION = 1
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# Query parameters holding credentials, which are never recorded
+SECRET_PARAMETERS = re.compile(
+    r'([?&](?:api_key|access_token|private_token|client_secret)=)[^&]*')
+
+_send = HTTPAdapter.send
+
+
+class CassetteMissing(requests.ConnectionError):
+    """No response was recorded for a request being replayed.
+    """
+
+
+def get_request_key(request):
+    """Identify a request by its method, URL and body."""
+    url = SECRET_PARAMETERS.sub(r'\1', request.url)
+    body = request.body or b''
+    if isinstance(body, str):
+        body = body.encode()
+    return '%s %s %s' % (request.method, url,
+                         base64.b64encode(body).decode())
+
+
+class Cassette():
+    """
+    Records every HTTP request sent through ``requests``, which is also
+    used by IGitt and PyGithub, or replays them without any network.
+
+    The cassette is a gzip file of JSON lines, one gzip member per
+    request, so that forked processes and the commands of a build can
+    append to it. Each interaction is tagged with the session which
+    recorded it, and a request is replayed from the latest session which
+    recorded it, so that recording again replaces stale responses.
+    """
+
+    def __init__(self, path, mode):
+        """
+        Constructs a new ``Cassette``
+
+        :param path: Path of the cassette file.
+        :param mode: ``RECORD`` or ``REPLAY``.
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError('Unknown cassette mode %s' % mode)
+        self.path = path
+        self.mode = mode
+        self.session = uuid.uuid4().hex
+        self.interactions = collections.defaultdict(collections.deque)
+        if mode == REPLAY:
+            self.load()
+
+    def load(self):
+        sessions = {}
+        with gzip.open(self.path, 'rt') as f:
+            for line in f:
+                interaction = json.loads(line)
+                if interaction['version'] != CASSETTE_VERSION:
+                    continue
+                key = interaction['request']
+                session = interaction.get('session')
+                # A later session recorded the request again
+                if key in sessions and sessions[key] != session:
+                    self.interactions[key].clear()
+                sessions[key] = session
+                self.interactions[key].append(interaction)
+
+    def append(self, interaction):
+        line = json.dumps(interaction) + '\n'
+        with open(self.path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(gzip.compress(line.encode()))
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def record(self, adapter, request, **kwargs):
+        response = _send(adapter, request, **kwargs)
+        headers = dict(response.headers)
+        # The recorded content is already decoded
+        headers.pop('Content-Encoding', None)
+        self.append({
+            'version': CASSETTE_VERSION,
+            'session': self.session,
+            'request': get_request_key(request),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': headers,
+            'content': base64.b64encode(response.content).decode(),
+        })
+        return response
+
+    def replay(self, adapter, request, **kwargs):
+        key = get_request_key(request)
+        recorded = self.interactions.get(key)
+        if not recorded:
+            raise CassetteMissing('No recorded response for %s' % key,
+                                  request=request)
+        # Identical requests are answered in the order they were
+        # recorded, repeating the last answer once they run out.
+        interaction = recorded[0]
+        if len(recorded) > 1:
+            recorded.popleft()
+
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = interaction['reason']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response._content = base64.b64decode(interaction['content'])
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    def send(self, adapter, request, **kwargs):
+        if self.mode == RECORD:
+            return self.record(adapter, request, **kwargs)
+        return self.replay(adapter, request, **kwargs)
+
+
+@contextlib.contextmanager
+def use_cassette(path, mode):
+    """Record or replay all HTTP traffic while the context is active.
+
+    The shared ``HTTPCache`` is replaced by an empty one, so that the
+    requests sent do not depend on what was cached by earlier builds.
+    """
+    cassette = start(path, mode)
+    try:
+        yield cassette
+    finally:
+        stop()
+
+
+_cache_dir = None
+_previous_cache = None
+_previous_send = None
+
+
+def start(path, mode):
+    global _cache_dir, _previous_cache, _previous_send
+    logger = logging.getLogger(__name__)
+    cassette = Cassette(path, mode)
+
+    _previous_cache = httpcache._cache
+    _cache_dir = tempfile.mkdtemp()
+    httpcache._cache = httpcache.HTTPCache(_cache_dir)
+
+    def send(adapter, request, **kwargs):
+        return cassette.send(adapter, request, **kwargs)
+    _previous_send = HTTPAdapter.send
+    HTTPAdapter.send = send
+
+    logger.info('HTTP cassette %s: %s' % (mode, path))
+    return cassette
+
+
+def stop():
+    if _previous_send:
+        HTTPAdapter.send = _previous_send
+    httpcache._cache = _previous_cache
+    if _cache_dir:
+        shutil.rmtree(_cache_dir, ignore_errors=True)
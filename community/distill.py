@@ -0,0 +1,337 @@
+import collections
+import errno
+import hashlib
+import json
+import multiprocessing
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django_distill.errors import DistillError
+from django_distill.renderer import DistillRender, load_urls
+
+# A single page to be distilled, as expanded from a ``distill_url``
+Page = collections.namedtuple('Page', [
+    'uri',
+    'file_name',
+    'param_set',
+    'view_name',
+    'view_args',
+])
+
+# The outcome of distilling a page. ``mime`` is None if it was skipped.
+Rendered = collections.namedtuple('Rendered', [
+    'page',
+    'full_path',
+    'mime',
+    'length',
+    'inputs',
+    'output',
+])
+
+MANIFEST_VERSION = 1
+
+_renderer = None
+_output_dir = None
+_pages = []
+_inputs = {}
+_code_hash = ''
+_manifest = {}
+
+
+def get_pages(renderer, urls_to_distill):
+    """Expand every ``distill_url`` into its pages.
+
+    The ``distill_func`` of each URL is called once, so the resulting
+    list can be split between workers.
+    """
+    for distill_func, file_name, view_name, a, k in urls_to_distill:
+        for param_set in renderer.get_uri_values(distill_func):
+            if not param_set:
+                param_set = ()
+            elif isinstance(param_set, str):
+                param_set = param_set,
+            uri = renderer.generate_uri(view_name, param_set)
+            page_file = file_name
+            if page_file is None and uri.endswith('/'):
+                page_file = uri.lstrip('/') + 'index.html'
+            yield Page(uri, page_file, param_set, view_name, a)
+
+
+def get_page_path(output_dir, page):
+    if page.file_name:
+        return os.path.join(output_dir, page.file_name)
+    return os.path.join(output_dir, page.uri.lstrip(os.sep))
+
+
+def write_page(output_dir, page, content):
+    full_path = get_page_path(output_dir, page)
+    try:
+        dirname = os.path.dirname(full_path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+    except IOError as e:
+        if e.errno == errno.EISDIR:
+            raise DistillError(
+                'Output path: %s is a directory! Try adding a '
+                '"distill_file" arg to your distill_url()' % full_path)
+        raise
+    return full_path
+
+
+def hash_bytes(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hash_bytes(f.read())
+    except IOError:
+        return None
+
+
+def hash_files(*paths):
+    """Hash the content of files, treating missing files as empty."""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.encode())
+        digest.update((hash_file(path) or '').encode())
+    return digest.hexdigest()
+
+
+def hash_tree(path, extensions=None):
+    """Hash the content of every file below a directory.
+
+    :param extensions: Tuple of the extensions of the files to hash, or
+                       None to hash all of them.
+    """
+    paths = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        paths.extend(os.path.join(root, f) for f in sorted(files)
+                     if extensions is None or f.endswith(extensions))
+    return hash_files(*paths)
+
+
+def hash_code():
+    """Hash all templates, and the Python code of the apps of the project,
+    which every page may depend on.
+    """
+    template_dirs = [path for engine in settings.TEMPLATES
+                     for path in engine['DIRS']]
+    template_dirs.extend(get_app_template_dirs('templates'))
+    base_dir = os.path.join(settings.BASE_DIR, '')
+    app_dirs = [app.path for app in apps.get_app_configs()
+                if app.path.startswith(base_dir)]
+    digest = hashlib.sha1()
+    for path in sorted(template_dirs):
+        digest.update(hash_tree(path).encode())
+    for path in sorted(app_dirs):
+        digest.update(hash_tree(path, ('.py',)).encode())
+    return digest.hexdigest()
+
+
+def get_row_fields(model):
+    """List the fields of a model, following its foreign keys one level."""
+    fields = []
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            fields.extend(
+                field.name + '__' + related.name
+                for related in field.related_model._meta.concrete_fields)
+        else:
+            fields.append(field.name)
+    return fields
+
+
+def hash_queryset(queryset):
+    """Hash the rows of a queryset, including rows they refer to."""
+    fields = get_row_fields(queryset.model)
+    rows = queryset.order_by('pk').values_list(*fields)
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def get_page_inputs(page):
+    """Hash the inputs of a page.
+
+    :return: Hex digest, or None if the inputs of the page are unknown
+             and it must always be rendered.
+    """
+    func = _inputs.get(page.view_name)
+    if func is None:
+        return None
+    if isinstance(page.param_set, dict):
+        inputs = func(**page.param_set)
+    else:
+        inputs = func(*page.param_set)
+    return hash_bytes((_code_hash + inputs).encode())
+
+
+def render_page(page):
+    """Render and write one page, unless its inputs are unchanged.
+
+    :return: ``Rendered`` tuple describing the page.
+    """
+    full_path = get_page_path(_output_dir, page)
+    inputs = get_page_inputs(page)
+    previous = _manifest.get(os.path.relpath(full_path, _output_dir))
+    if (inputs and previous and previous['inputs'] == inputs
+            and previous['output'] == hash_file(full_path)):
+        return Rendered(page, full_path, None, None,
+                        inputs, previous['output'])
+
+    response = _renderer.render_view(page.uri, page.param_set, page.view_args)
+    content = response.content
+    write_page(_output_dir, page, content)
+    mime = response.get('Content-Type').split(';')[0].strip()
+    return Rendered(page, full_path, mime, len(content),
+                    inputs, hash_bytes(content))
+
+
+def load_manifest(path):
+    """Load the pages recorded by a previous build, keyed by path."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['pages']
+
+
+def save_manifest(path, pages):
+    with open(path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'pages': pages}, f,
+                  indent=1, sort_keys=True)
+
+
+def use_cached_templates():
+    """Switch the template engine to the cached loader.
+
+    Templates compiled in the parent process are then shared by every
+    forked worker instead of being parsed again for each page.
+    """
+    engine = engines['django'].engine
+    loader = 'django.template.loaders.cached.Loader'
+    first = engine.loaders[0]
+    if isinstance(first, tuple) and first[0] == loader:
+        return
+    engine.loaders = [(loader, engine.loaders)]
+    engine.__dict__.pop('template_loaders', None)
+
+
+def _render_index(index):
+    # Views are not picklable, so workers look pages up in the list
+    # inherited from the parent process.
+    return index, render_page(_pages[index])[1:]
+
+
+def _render_parallel(processes):
+    # Render the first page of each view in this process, so that
+    # imports, URL resolution and compiled templates are inherited
+    # by the workers.
+    warm = set()
+    views = set()
+    for index, page in enumerate(_pages):
+        if page.view_args[1] not in views:
+            views.add(page.view_args[1])
+            warm.add(index)
+            yield render_page(page)
+
+    rest = [index for index in range(len(_pages)) if index not in warm]
+    if not rest:
+        return
+
+    # Each worker must open its own database connection.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes) as pool:
+        chunksize = max(1, len(rest) // (processes * 4))
+        for index, result in pool.imap_unordered(_render_index, rest,
+                                                 chunksize):
+            yield Rendered(_pages[index], *result)
+
+
+def render_to_dir(output_dir, urls_to_distill, stdout, processes=1,
+                  manifest=None, inputs=None):
+    """Render all distilled pages into ``output_dir``.
+
+    :param processes: Number of worker processes to render pages with.
+                      ``0`` uses one per CPU.
+    :param manifest:  Path of the build manifest. Pages whose inputs and
+                      output are unchanged since it was written are
+                      skipped, and pages no longer distilled are removed.
+    :param inputs:    Dict of view name to a function hashing the inputs
+                      of a page, called with the page parameters.
+    """
+    global _renderer, _output_dir, _pages
+    global _inputs, _code_hash, _manifest
+    if not processes:
+        processes = os.cpu_count() or 1
+
+    load_urls(stdout)
+    _renderer = DistillRender(output_dir, urls_to_distill)
+    _output_dir = output_dir
+    _manifest = load_manifest(manifest) if manifest else {}
+    _inputs = inputs or {}
+    _code_hash = hash_code()
+
+    _pages = list(get_pages(_renderer, urls_to_distill))
+    stdout('Rendering %d pages with %d processes' % (len(_pages), processes))
+
+    if processes > 1:
+        use_cached_templates()
+        results = _render_parallel(processes)
+    else:
+        results = map(render_page, _pages)
+
+    pages = {}
+    rebuilt = 0
+    for result in results:
+        pages[os.path.relpath(result.full_path, output_dir)] = {
+            'inputs': result.inputs,
+            'output': result.output,
+        }
+        if result.mime is None:
+            continue
+        rebuilt += 1
+        stdout('Rendering page: %s -> %s ["%s", %d bytes]'
+               % (result.page.uri, result.full_path, result.mime,
+                  result.length))
+
+    for path in set(_manifest) - set(pages):
+        full_path = os.path.join(output_dir, path)
+        if os.path.exists(full_path):
+            stdout('Removing page: %s' % full_path)
+            os.remove(full_path)
+
+    if manifest:
+        save_manifest(manifest, pages)
+    stdout('Rebuilt %d of %d pages' % (rebuilt, len(pages)))
+
+    copy_static(output_dir, stdout)
+
+
+def copy_static(output_dir, stdout):
+    static_url = settings.STATIC_URL.lstrip('/')
+    static_output_dir = os.path.join(output_dir, static_url)
+    for file_from, file_to in _renderer.copy_static(settings.STATIC_ROOT,
+                                                    static_output_dir):
+        stdout('Copying static: %s -> %s' % (file_from, file_to))
+
+    if settings.MEDIA_ROOT and os.path.isdir(settings.MEDIA_ROOT):
+        media_url = settings.MEDIA_URL.lstrip('/')
+        media_output_dir = os.path.join(output_dir, media_url)
+        for file_from, file_to in _renderer.copy_static(settings.MEDIA_ROOT,
+                                                        media_output_dir):
+            stdout('Copying media: %s -> %s' % (file_from, file_to))
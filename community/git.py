@@ -81,21 +81,32 @@ def get_owner():
     return url.owner
 
 
+def get_token(url):
+    """Obtain the IGitt token of the hoster of the URL.
+
+    Return: None if the hoster is not supported
+    """
+    if url.resource == 'github.com':
+        # Allow unauthenticated requests
+        try:
+            token = get_api_key('GH')
+        except Exception:
+            token = None
+        return GitHubToken(token)
+    elif url.resource == 'gitlab.com':
+        # https://gitlab.com/gitmate/open-source/IGitt/issues/114
+        return GitLabPrivateToken(get_api_key('GL'))
+
+
 def get_ihoster(url):
     global _IGH, _IGL
     if url.resource == 'github.com':
         if not _IGH:
-            # Allow unauthenticated requests
-            try:
-                token = get_api_key('GH')
-            except Exception:
-                token = None
-            _IGH = GitHub(GitHubToken(token))
+            _IGH = GitHub(get_token(url))
         return _IGH
     elif url.resource == 'gitlab.com':
         if not _IGL:
-            # https://gitlab.com/gitmate/open-source/IGitt/issues/114
-            _IGL = GitLab(GitLabPrivateToken(get_api_key('GL')))
+            _IGL = GitLab(get_token(url))
 
         return _IGL
 
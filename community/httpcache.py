@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from django.conf import settings
+from urllib3.response import HTTPResponse
+
+# Response headers kept with a cached body
+STORED_HEADERS = (
+    'Content-Type',
+    'ETag',
+    'Last-Modified',
+)
+
+# Bytes read at a time when streaming a body into the cache
+CHUNK_SIZE = 64 * 1024
+
+_cache = None
+
+
+class HTTPCache():
+    """
+    An on-disk cache of HTTP GET responses.
+
+    Bodies are stored with their ``ETag`` and ``Last-Modified`` headers,
+    and are revalidated with ``If-None-Match`` and ``If-Modified-Since``,
+    so that an unchanged upstream only costs a ``304 Not Modified``.
+    """
+
+    def __init__(self, directory, max_age=0, ttl=30 * 24 * 3600,
+                 max_size=512 * 1024 * 1024):
+        """
+        Constructs a new ``HTTPCache``
+
+        :param directory: Directory to store responses in.
+        :param max_age:   Seconds a response is used without revalidating.
+        :param ttl:       Seconds after which an unused response is evicted.
+        :param max_size:  Bytes of bodies to keep, evicting the least
+                          recently used responses beyond it.
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = {
+            'hits': 0,
+            'revalidated': 0,
+            'misses': 0,
+            'evicted': 0,
+        }
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, url, params):
+        key = url
+        if params:
+            key += '?' + json.dumps(params, sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _load(self, key):
+        """
+        :return: Metadata and open body file of the cached response.
+        """
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            body = open(body_path, 'rb')
+        except (IOError, ValueError):
+            return None, None
+        return meta, body
+
+    def _write(self, path, chunks, mode='wb'):
+        # Write atomically, as fetchers may share the cache between threads
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, mode) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def _store(self, key, meta, body=None):
+        """
+        :param body: Iterable of the bytes of the body, if it changed.
+        """
+        meta_path, body_path = self._paths(key)
+        if body is not None:
+            self._write(body_path, body)
+        self._write(meta_path, [json.dumps(meta)], 'w')
+
+    def _response(self, url, meta, body, stream=False):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        if stream:
+            # Read from the cache file as it is iterated, closing it at
+            # the end of the body.
+            response.raw = HTTPResponse(body=body, preload_content=False)
+        else:
+            with body:
+                response._content = body.read()
+            response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        return response
+
+    def get(self, url, params=None, headers=None, stream=False, **kwargs):
+        """Send a GET request, unless a fresh response is cached.
+
+        Only successful responses are cached, others are returned as is.
+
+        :param stream: Whether to read the body from the cache file as it
+                       is iterated, instead of loading it in memory.
+        :return: ``requests.Response``
+        """
+        key = self._key(url, params)
+        meta, body = self._load(key)
+        headers = dict(headers or {})
+
+        if meta:
+            # The body may be evicted by another thread once it is open,
+            # and is then still read from the open file
+            try:
+                os.utime(self._paths(key)[1])
+            except OSError:
+                pass
+            if time.time() - meta['stored'] < self.max_age:
+                self._count('hits')
+                return self._response(url, meta, body, stream)
+            stored_headers = meta['headers']
+            if stored_headers.get('ETag'):
+                headers['If-None-Match'] = stored_headers['ETag']
+            if stored_headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = stored_headers['Last-Modified']
+
+        response = requests.get(url, params=params, headers=headers,
+                                stream=stream, **kwargs)
+
+        if meta and response.status_code == 304:
+            self._count('revalidated')
+            meta['stored'] = time.time()
+            self._store(key, meta)
+            return self._response(url, meta, body, stream)
+
+        if body:
+            body.close()
+        self._count('misses')
+        if response.status_code == 200:
+            meta = {
+                'stored': time.time(),
+                'headers': dict((name, response.headers[name])
+                                for name in STORED_HEADERS
+                                if name in response.headers),
+            }
+            if stream:
+                with response:
+                    self._store(key, meta, response.iter_content(CHUNK_SIZE))
+                meta, body = self._load(key)
+                response = self._response(url, meta, body, stream)
+            else:
+                self._store(key, meta, [response.content])
+            self.evict()
+        return response
+
+    def evict(self):
+        """Remove expired responses, then the least recently used ones
+        until the bodies fit in ``max_size``.
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.body'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-5]))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for used, size, key in entries:
+            if now - used < self.ttl and total <= self.max_size:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            self._count('evicted')
+
+
+def get_http_cache():
+    global _cache
+    if not _cache:
+        _cache = HTTPCache(settings.HTTP_CACHE_DIR,
+                           max_age=settings.HTTP_CACHE_MAX_AGE,
+                           ttl=settings.HTTP_CACHE_TTL,
+                           max_size=settings.HTTP_CACHE_MAX_SIZE)
+    return _cache
+
+
+def cached_get(url, **kwargs):
+    """Send a GET request through the shared ``HTTPCache``."""
+    return get_http_cache().get(url, **kwargs)
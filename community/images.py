@@ -0,0 +1,138 @@
+import collections
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+# Formats of the variants of images, by file extension, with the options
+# they are saved with
+FORMATS = collections.OrderedDict([
+    ('png', {'format': 'PNG', 'optimize': True}),
+    ('webp', {'format': 'WEBP', 'quality': 90, 'method': 6}),
+])
+
+# Variants of the logo of an org written to the site, by file name, with
+# their size in pixels, 0 for the original size, and their formats
+LOGO_VARIANTS = collections.OrderedDict([
+    ('favicon', (16, ('png', ))),
+    ('org_logo', (0, ('png', 'webp'))),
+])
+
+# File recording the source of the variants written to a directory
+VARIANTS_INDEX = '.variants.json'
+
+
+def write_if_changed(path, content):
+    """Write the bytes to the file, unless it already holds them, so that
+    unchanged files keep their modification time.
+
+    :return: Whether the file was written.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except IOError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(content)
+    return True
+
+
+def resize_image(image, size):
+    """
+    :param size: Size of the square the image is scaled down to fit in,
+                 or 0 to keep the original size.
+    """
+    if size:
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+    return image
+
+
+def encode_image(image, extension):
+    """
+    :return: Bytes of the image in the format of the extension.
+    """
+    f = io.BytesIO()
+    image.save(f, **FORMATS[extension])
+    return f.getvalue()
+
+
+def load_variants_index(directory):
+    """
+    :return: Dict of the file name of each variant written to the directory
+             by ``write_image_variants`` to the source it was derived from.
+    """
+    try:
+        with open(os.path.join(directory, VARIANTS_INDEX)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def write_image_variants(content, directory, variants):
+    """Derive resized variants of an image, and write each of them to the
+    directory in the formats of ``FORMATS`` it is listed with.
+
+    Variants derived from the same image at the same size by an earlier
+    call are not encoded again, and only the files whose bytes changed
+    are rewritten.
+
+    :param content:   Bytes of the source image.
+    :param variants:  Dict of the file name without extension of each
+                      variant to its size, as in ``resize_image``, and
+                      the extensions of its formats.
+    :return: Dict of the name of each variant to its file name in each
+             format, by extension.
+    :raises OSError: If the content is not an image.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    index = load_variants_index(directory)
+    image = None
+
+    os.makedirs(directory, exist_ok=True)
+    filenames = {}
+    for name, (size, extensions) in variants.items():
+        filenames[name] = collections.OrderedDict()
+        resized = None
+        for extension in extensions:
+            filename = '%s.%s' % (name, extension)
+            filenames[name][extension] = filename
+            path = os.path.join(directory, filename)
+            source = [digest, size]
+            if index.get(filename) == source and os.path.exists(path):
+                continue
+            if image is None:
+                image = Image.open(io.BytesIO(content))
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+            if resized is None:
+                resized = resize_image(image, size)
+            write_if_changed(path, encode_image(resized, extension))
+            index[filename] = source
+
+    write_if_changed(os.path.join(directory, VARIANTS_INDEX),
+                     json.dumps(index, sort_keys=True).encode())
+    return filenames
+
+
+def write_field_variants(field_file, directory, variants):
+    """Write the variants of the image of an ``ImageField`` to the
+    directory, as ``write_image_variants``.
+
+    :param field_file: The ``FieldFile`` of the image.
+    :return: The file names of ``write_image_variants``, or None if there
+             is no image.
+    :raises OSError: If the image cannot be read.
+    """
+    if not field_file:
+        return None
+    field_file.open('rb')
+    try:
+        content = field_file.read()
+    finally:
+        field_file.close()
+    return write_image_variants(content, directory, variants)
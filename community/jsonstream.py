@@ -0,0 +1,116 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+# Characters which may follow a complete value
+DELIMITERS = WHITESPACE + ',:]}'
+
+
+class _Reader():
+    """
+    Decodes JSON values one at a time from an iterable of byte chunks,
+    keeping only the undecoded part of the document in memory.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size):
+        """Read chunks until ``size`` characters are available at pos.
+
+        :return: False if the document ends before that.
+        """
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        while len(self.buffer) < size and not self.eof:
+            try:
+                self.buffer += self.decoder.decode(next(self.chunks))
+            except StopIteration:
+                self.buffer += self.decoder.decode(b'', final=True)
+                self.eof = True
+        return len(self.buffer) >= size
+
+    def next_char(self):
+        """Consume whitespace and the next character."""
+        while True:
+            while (self.pos < len(self.buffer)
+                   and self.buffer[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill(1):
+                break
+        if self.pos >= len(self.buffer):
+            raise json.JSONDecodeError('Unexpected end of document',
+                                       self.buffer, self.pos)
+        self.pos += 1
+        return self.buffer[self.pos - 1]
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char not in chars:
+            raise json.JSONDecodeError('Expected one of %r' % chars,
+                                       self.buffer, self.pos - 1)
+        return char
+
+    def value(self):
+        """Consume the next value."""
+        self.next_char()
+        self.pos -= 1
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer,
+                                                          self.pos)
+                # A number may continue in the next chunk
+                if self.eof or (end < len(self.buffer)
+                                and self.buffer[end] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically, so a value spanning many
+            # chunks is decoded in linear time.
+            self.fill(2 * (len(self.buffer) - self.pos))
+
+
+def iter_json_array(chunks, key):
+    """Yield the items of an array in a JSON object as they are decoded.
+
+    Other members of the object are decoded and discarded.
+
+    :param chunks: Iterable of UTF-8 encoded bytes of the document.
+    :param key:    Name of the member holding the array.
+    :return:       Generator of the items.
+    :raises KeyError:  If the object has no such member.
+    :raises json.JSONDecodeError: If the document is not valid JSON.
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.next_char() == '}':
+        raise KeyError(key)
+    reader.pos -= 1
+
+    while True:
+        name = reader.value()
+        if not isinstance(name, str):
+            raise json.JSONDecodeError('Expected a member name',
+                                       reader.buffer, reader.pos)
+        reader.expect(':')
+        if name != key:
+            reader.value()
+        else:
+            reader.expect('[')
+            if reader.next_char() != ']':
+                reader.pos -= 1
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+            return
+        if reader.expect(',}') == '}':
+            raise KeyError(key)
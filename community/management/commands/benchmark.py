@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+
+from community.benchmark import BENCHMARKS, get_environment, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Time the build hot paths on synthetic datasets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', dest='scales', type=float,
+                            nargs='+', default=[0.01, 0.1],
+                            help='Dataset sizes, as factors of the '
+                                 'default sizes')
+        parser.add_argument('--benchmark', dest='names', nargs='+',
+                            choices=list(BENCHMARKS),
+                            help='Benchmarks to run, all by default')
+        parser.add_argument('--parallel', dest='parallel', type=int,
+                            default=1,
+                            help='Number of processes distilling pages')
+        parser.add_argument('--output', dest='output', type=str,
+                            help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        # The benchmarks fill the database with synthetic rows
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            results = []
+            for result in run_benchmarks(options.get('scales'),
+                                         options.get('names'),
+                                         options.get('parallel')):
+                self.stdout.write('%-20s scale %-6g %8d records %9.3fs'
+                                  % result)
+                results.append(result._asdict())
+        finally:
+            runner.teardown_databases(old_config)
+
+        output = options.get('output')
+        if output:
+            with open(output, 'w') as f:
+                json.dump({
+                    'environment': get_environment(),
+                    'results': results,
+                }, f, indent=2)
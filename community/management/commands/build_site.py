@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from community.acquisition import SOURCES, get_gci_sources
+from community.httpcache import get_http_cache
+from community.profiling import format_report, run_phase
+
+EXPORTED_DATA = ('static/tasks.yaml', 'static/instances.yaml')
+
+
+class Command(BaseCommand):
+    help = 'Build the site, reporting the resources used by each phase'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', nargs='?', type=str,
+                            default='public')
+        parser.add_argument('--report', dest='report', type=str,
+                            help='Write the report as JSON to this file')
+        parser.add_argument('--parallel', dest='parallel', type=int,
+                            default=1,
+                            help='Number of processes distilling pages')
+        parser.add_argument('--manifest', dest='manifest', type=str,
+                            help='Build manifest for incremental distill')
+
+    def get_import_phases(self, gci_dir=None):
+        """List a phase importing each source of ``import_all_data``, so
+        that the report is broken down by source.
+        """
+        sources = SOURCES
+        options = {}
+        if gci_dir:
+            sources += get_gci_sources(gci_dir)
+            options['gci_dir'] = gci_dir
+        return [('import:' + source.name, 'import_all_data', (),
+                 dict(options, sources=[source.name]))
+                for source in sources]
+
+    def get_phases(self, options):
+        """List the phases of the build.
+
+        :return: List of phase name, command name, arguments and options
+                 tuples.
+        """
+        phases = [('migrate', 'migrate', (), {'interactive': False})]
+        if os.environ.get('GCI_TOKEN'):
+            phases += self.get_import_phases('private')
+            phases += [
+                ('cleanse_gci_task_data', 'cleanse_gci_task_data',
+                 ('private', '_site'), {}),
+            ]
+        else:
+            phases += [
+                ('fetch_deployed_data', 'fetch_deployed_data',
+                 ('_site', ) + EXPORTED_DATA, {}),
+            ]
+            phases += self.get_import_phases()
+
+        distill_options = {
+            'force': True,
+            'parallel': options.get('parallel'),
+        }
+        if options.get('manifest'):
+            distill_options['manifest'] = options.get('manifest')
+
+        phases += [
+            ('collectstatic', 'collectstatic', (), {'interactive': False}),
+            ('distill-local', 'distill-local', (options.get('output_dir'), ),
+             distill_options),
+        ]
+        return phases
+
+    def handle(self, *args, **options):
+        reports = []
+        error = None
+        for name, command, command_args, command_options in \
+                self.get_phases(options):
+            self.stdout.write('Running %s' % name)
+            report, error = run_phase(
+                name,
+                functools.partial(call_command, command, *command_args,
+                                  **command_options))
+            reports.append(report)
+            if error:
+                break
+
+        self.stdout.write(format_report(reports))
+        self.stdout.write(
+            'HTTP cache: {hits} hits, {revalidated} revalidated, '
+            '{misses} misses, {evicted} evicted'.format(
+                **get_http_cache().stats))
+
+        report_file = options.get('report')
+        if report_file:
+            if os.path.dirname(report_file):
+                os.makedirs(os.path.dirname(report_file), exist_ok=True)
+            with open(report_file, 'w') as f:
+                json.dump([report._asdict() for report in reports], f,
+                          indent=2)
+
+        if error:
+            raise CommandError('Build phase %s failed: %s'
+                               % (reports[-1].name, error)) from error
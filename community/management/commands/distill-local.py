@@ -0,0 +1,76 @@
+from importlib import import_module
+import os
+from shutil import rmtree
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django_distill.distill import urls_to_distill
+from django_distill.errors import DistillError
+from django_distill.renderer import run_collectstatic
+
+from community.distill import render_to_dir
+
+
+class Command(BaseCommand):
+    help = 'Generates a static local site using distill'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', nargs='?', type=str)
+        parser.add_argument('--collectstatic', dest='collectstatic',
+                            action='store_true')
+        parser.add_argument('--quiet', dest='quiet', action='store_true')
+        parser.add_argument('--force', dest='force', action='store_true')
+        parser.add_argument('--parallel', dest='parallel', type=int,
+                            default=1,
+                            help='Number of processes rendering pages, '
+                                 '0 for one per CPU')
+        parser.add_argument('--manifest', dest='manifest', type=str,
+                            help='Build manifest, to only render pages '
+                                 'whose inputs changed since last build')
+
+    def _quiet(self, *args, **kwargs):
+        pass
+
+    def handle(self, *args, **options):
+        output_dir = options.get('output_dir')
+        force = options.get('force')
+        manifest = options.get('manifest')
+        if options.get('quiet'):
+            stdout = self._quiet
+        else:
+            stdout = self.stdout.write
+
+        if not output_dir:
+            output_dir = getattr(settings, 'DISTILL_DIR', None)
+            if not output_dir:
+                raise CommandError(
+                    'Usage: ./manage.py distill-local [directory]')
+        if options.get('collectstatic'):
+            run_collectstatic(stdout)
+        if not os.path.isdir(settings.STATIC_ROOT):
+            raise CommandError(
+                'Static source directory does not exist, run collectstatic')
+
+        output_dir = os.path.abspath(os.path.expanduser(output_dir))
+        # Incremental builds keep the pages of the previous build
+        if os.path.isdir(output_dir) and not manifest:
+            if not force:
+                answer = input('Distill output directory %s exists, '
+                               'type \'yes\' to recreate it: ' % output_dir)
+                if answer.lower() != 'yes':
+                    raise CommandError('Distilling site cancelled.')
+            stdout('Recreating output directory %s' % output_dir)
+            rmtree(output_dir)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        stdout('Generating static site into directory: %s' % output_dir)
+        urlconf = import_module(settings.ROOT_URLCONF)
+        try:
+            render_to_dir(output_dir, urls_to_distill, stdout,
+                          processes=options.get('parallel'),
+                          manifest=manifest,
+                          inputs=getattr(urlconf, 'distill_inputs', None))
+        except DistillError as err:
+            raise CommandError(str(err)) from err
+        stdout('Site generation complete.')
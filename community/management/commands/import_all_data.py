@@ -0,0 +1,46 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from community.acquisition import acquire, get_gci_sources, SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Fetch all data sources concurrently and import them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gci-dir', dest='gci_dir', type=str,
+                            help='Also fetch the GCI data into this '
+                                 'directory')
+        parser.add_argument('--source', dest='sources', action='append',
+                            help='Only import this source, which may be '
+                                 'repeated')
+
+    def handle(self, *args, **options):
+        logger = logging.getLogger(__name__)
+        sources = SOURCES
+        gci_dir = options.get('gci_dir')
+        if gci_dir:
+            sources += get_gci_sources(gci_dir)
+        names = options.get('sources')
+        if names:
+            unknown = set(names) - set(source.name for source in sources)
+            if unknown:
+                raise CommandError('Unknown sources %s'
+                                   % ', '.join(sorted(unknown)))
+            sources = tuple(source for source in sources
+                            if source.name in names)
+
+        counts = acquire(sources)
+        for name, count in sorted(counts.items()):
+            if count is None:
+                self.stdout.write('%s: failed' % name)
+            else:
+                self.stdout.write('%s: %d records' % (name, count))
+        logger.info('All data is imported')
+
+        # The GCI data is required by the rest of the build
+        failed = [name for name, count in counts.items()
+                  if count is None and name.startswith('gci_')]
+        if failed:
+            raise CommandError('Unable to fetch %s' % ', '.join(failed))
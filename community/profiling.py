@@ -0,0 +1,166 @@
+import collections
+import contextlib
+import functools
+import resource
+import threading
+import time
+
+import requests
+from django.db.backends import utils as db_utils
+
+# Metrics recorded for one phase of a build
+PhaseReport = collections.namedtuple('PhaseReport', [
+    'name',
+    'wall_time',
+    'cpu_time',
+    'peak_rss',
+    'http_requests',
+    'sql_queries',
+    'sql_time',
+    'error',
+])
+
+REPORT_COLUMNS = (
+    ('name', 'Phase', '%s'),
+    ('wall_time', 'Wall (s)', '%.2f'),
+    ('cpu_time', 'CPU (s)', '%.2f'),
+    ('peak_rss', 'Peak RSS (MB)', '%.1f'),
+    ('http_requests', 'HTTP requests', '%d'),
+    ('sql_queries', 'SQL queries', '%d'),
+    ('sql_time', 'SQL (s)', '%.2f'),
+)
+
+
+class CallCounter():
+    """
+    Counts calls of a method, and the time spent in them, from any thread.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.lock = threading.Lock()
+
+    def wrap(self, method):
+        @functools.wraps(method)
+        def counted(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.count += 1
+                    self.time += elapsed
+        return counted
+
+
+@contextlib.contextmanager
+def count_calls(counter, cls, *names):
+    originals = dict((name, getattr(cls, name)) for name in names)
+    for name, method in originals.items():
+        setattr(cls, name, counter.wrap(method))
+    try:
+        yield counter
+    finally:
+        for name, method in originals.items():
+            setattr(cls, name, method)
+
+
+def get_cpu_time():
+    """Return the CPU time of this process and its finished children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def reset_peak_rss():
+    """Reset the highest resident set size of this process, which is only
+    possible on Linux.
+
+    :return: Whether it was reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def get_peak_rss():
+    """Return the highest resident set size of this process since
+    ``reset_peak_rss``, in megabytes.
+    """
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise OSError('VmHWM is missing from /proc/self/status')
+
+
+def run_phase(name, func):
+    """Run one phase of a build, recording its resource usage.
+
+    HTTP requests made through ``requests`` and SQL queries made through
+    the Django ORM are counted, including those of IGitt and PyGithub.
+    Work done in forked worker processes only contributes CPU time.
+    The peak RSS is None where it cannot be measured for the phase alone.
+
+    :return: Tuple of ``PhaseReport`` and the exception raised, if any.
+    """
+    http = CallCounter()
+    sql = CallCounter()
+    error = None
+    wall_start = time.perf_counter()
+    cpu_start = get_cpu_time()
+    measure_rss = reset_peak_rss()
+
+    with count_calls(http, requests.Session, 'send'), \
+            count_calls(sql, db_utils.CursorWrapper,
+                        'execute', 'executemany'):
+        try:
+            func()
+        except Exception as e:
+            error = e
+
+    peak_rss = None
+    if measure_rss:
+        try:
+            peak_rss = get_peak_rss()
+        except OSError:
+            pass
+
+    report = PhaseReport(
+        name=name,
+        wall_time=time.perf_counter() - wall_start,
+        cpu_time=get_cpu_time() - cpu_start,
+        peak_rss=peak_rss,
+        http_requests=http.count,
+        sql_queries=sql.count,
+        sql_time=sql.time,
+        error=str(error) if error else None,
+    )
+    return report, error
+
+
+def format_report(reports):
+    """Format phase reports as a plain text table, with ``-`` for the
+    metrics which were not measured."""
+    rows = [[title for _, title, _ in REPORT_COLUMNS]]
+    for report in reports:
+        rows.append(['-' if getattr(report, field) is None
+                     else fmt % getattr(report, field)
+                     for field, _, fmt in REPORT_COLUMNS])
+    widths = [max(len(row[i]) for row in rows)
+              for i in range(len(REPORT_COLUMNS))]
+
+    lines = []
+    for row in rows:
+        lines.append('  '.join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))))
+    lines.insert(1, '-' * len(lines[0]))
+    return '\n'.join(lines)
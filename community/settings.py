@@ -33,6 +33,7 @@ ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver']
 # Application definition
 
 INSTALLED_APPS = [
+    'community.apps.CommunityConfig',
     'gci',
     'gsoc',
     'data',
@@ -134,3 +135,40 @@ STATIC_ROOT = '_site/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATICFILES_DIRS = ['static/']
+
+# Persistent cache of upstream HTTP responses
+HTTP_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'http')
+# Seconds a response is used without revalidating it
+HTTP_CACHE_MAX_AGE = 0
+# Seconds after which an unused response is evicted
+HTTP_CACHE_TTL = 30 * 24 * 3600
+# Bytes of response bodies kept in the cache
+HTTP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+# Daily issue counters of the activity scraper, kept between builds
+ACTIVITY_STATE_FILE = os.path.join(BASE_DIR, '.cache', 'activity.json')
+# Either 'gh-board' to scrape its dump of the org issues, or 'github' to
+# sync them from the GitHub API
+ACTIVITY_SOURCE = os.environ.get('ACTIVITY_SOURCE', 'gh-board')
+# Issues synced from the GitHub API
+ACTIVITY_ISSUES_FILE = os.path.join(BASE_DIR, '.cache', 'issues.json')
+# Pages of the GCI API fetched so far, to resume an interrupted fetch from
+GCI_CHECKPOINT_DIR = os.path.join(BASE_DIR, '.cache', 'gci')
+# Age in seconds after which the pages of an interrupted fetch are stale
+GCI_CHECKPOINT_MAX_AGE = 6 * 3600
+# Compiled caches of the GCI data files, kept out of STATIC_ROOT so they
+# are not deployed
+GCI_COMPILED_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'gci_compiled')
+# Users linked to the issues of GCI tasks, kept between builds
+GCI_LINKED_USERS_FILE = os.path.join(BASE_DIR, '.cache', 'gci_issues.json')
+# Whether GitHub users exist, by login, checked at most once per TTL
+GITHUB_USERS_FILE = os.path.join(BASE_DIR, '.cache', 'github_users.json')
+GITHUB_USERS_TTL = 7 * 24 * 3600
+# Rendered descriptions of the tasks in the GCI feeds, kept between builds
+GCI_FEED_DESCRIPTIONS_FILE = os.path.join(BASE_DIR, '.cache',
+                                          'gci_feed.json')
+
+# Record all upstream HTTP traffic into this file, or replay it from there
+HTTP_CASSETTE = os.environ.get('HTTP_CASSETTE')
+# Either 'record' or 'replay'
+HTTP_CASSETTE_MODE = os.environ.get('HTTP_CASSETTE_MODE', 'replay')
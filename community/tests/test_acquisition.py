@@ -0,0 +1,53 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from community.acquisition import acquire, Source
+
+
+class AcquireTest(SimpleTestCase):
+
+    def setUp(self):
+        self.running = 0
+        self.max_running = 0
+        self.imported = []
+        self.lock = threading.Lock()
+
+    def fetch(self, records):
+        def fetch():
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            return records
+        return fetch
+
+    def import_data(self, record):
+        self.imported.append((record, threading.current_thread()))
+
+    def fail_import(self, record):
+        raise ValueError('invalid record')
+
+    def fail(self):
+        raise ValueError('unavailable')
+
+    def test_acquire(self):
+        sources = [
+            Source('a', 'host', self.fetch([1, 2]), self.import_data),
+            Source('b', 'host', self.fetch([3]), self.import_data),
+            Source('c', 'other', self.fetch([4]), self.import_data),
+            Source('d', 'other', self.fail, self.import_data),
+            Source('e', 'other', self.fetch([5]), self.fail_import),
+        ]
+        counts = acquire(sources, {'host': 1, 'other': 1})
+
+        self.assertEqual(counts,
+                         {'a': 2, 'b': 1, 'c': 1, 'd': None, 'e': None})
+        self.assertEqual(sorted(record for record, _ in self.imported),
+                         [1, 2, 3, 4])
+        for _, thread in self.imported:
+            self.assertIs(thread, threading.current_thread())
+        self.assertEqual(self.max_running, 2)
@@ -0,0 +1,16 @@
+from django.test import TestCase
+
+from community.benchmark import BENCHMARKS, run_benchmarks
+
+
+class RunBenchmarksTest(TestCase):
+
+    def test_smoke(self):
+        results = list(run_benchmarks([0.0001]))
+
+        self.assertEqual([result.benchmark for result in results],
+                         list(BENCHMARKS))
+        for result in results:
+            self.assertEqual(result.scale, 0.0001)
+            self.assertGreater(result.records, 0)
+            self.assertGreaterEqual(result.seconds, 0)
@@ -0,0 +1,76 @@
+import gzip
+import json
+import os.path
+import shutil
+import tempfile
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from community.cassette import (
+    CassetteMissing,
+    RECORD,
+    REPLAY,
+    use_cassette,
+)
+
+
+def fake_send(adapter, request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = ('sent %s' % request.url).encode()
+    response.headers['Content-Type'] = 'text/plain'
+    return response
+
+
+class CassetteTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cassette.gz')
+
+    @mock.patch('community.cassette._send', side_effect=fake_send)
+    def test_record_replay(self, send):
+        url = 'https://www.openhub.net/orgs/x.xml?api_key=secret&page=1'
+        with use_cassette(self.path, RECORD):
+            requests.get(url)
+            requests.post('https://example.com/', data='a')
+
+        with gzip.open(self.path, 'rt') as f:
+            keys = [json.loads(line)['request'] for line in f]
+        self.assertEqual(keys[0].split(' ')[1],
+                         'https://www.openhub.net/orgs/x.xml?api_key=&page=1')
+        self.assertFalse([key for key in keys if 'secret' in key])
+
+        with use_cassette(self.path, REPLAY):
+            response = requests.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.text, 'sent ' + url)
+            self.assertEqual(requests.post('https://example.com/',
+                                           data='a').text,
+                             'sent https://example.com/')
+            with self.assertRaises(CassetteMissing):
+                requests.post('https://example.com/', data='b')
+        self.assertEqual(send.call_count, 2)
+
+    @mock.patch('community.cassette._send', side_effect=fake_send)
+    def test_record_again(self, send):
+        url = 'https://example.com/'
+        with use_cassette(self.path, RECORD):
+            requests.get(url)
+            requests.get(url)
+
+        def send_again(adapter, request, **kwargs):
+            response = fake_send(adapter, request, **kwargs)
+            response._content = b'recorded again'
+            return response
+        send.side_effect = send_again
+        with use_cassette(self.path, RECORD):
+            requests.get(url)
+
+        # Only the responses of the latest recording are replayed
+        with use_cassette(self.path, REPLAY):
+            self.assertEqual(requests.get(url).text, 'recorded again')
+            self.assertEqual(requests.get(url).text, 'recorded again')
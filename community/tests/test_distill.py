@@ -0,0 +1,155 @@
+import json
+import os.path
+import shutil
+import tempfile
+from importlib import import_module
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django_distill.distill import urls_to_distill
+from django_distill.renderer import DistillRender, load_urls
+
+from community.distill import get_pages, render_page, render_to_dir
+from community.urls import distill_inputs
+from openhub.models import OutsideProject
+
+
+def get_urls(prefix):
+    load_urls(lambda message: None)
+    return [url for url in urls_to_distill if url[2].startswith(prefix)]
+
+
+class DistillTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            OutsideProject.objects.create(name='project' + str(i),
+                                          activity='High', org='test')
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_get_pages(self):
+        urls = get_urls('outsideproject')
+        pages = list(get_pages(DistillRender(self.output_dir, urls), urls))
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(pages[0].file_name,
+                         'model/openhub/outside_projects/index.html')
+        for page, project in zip(pages[1:], OutsideProject.objects.all()):
+            self.assertEqual(page.param_set, {'pk': project.id})
+
+    def test_render_to_dir(self):
+        urls = get_urls('outsideproject')
+        render_to_dir(self.output_dir, urls, lambda message: None)
+        for project in OutsideProject.objects.all():
+            path = os.path.join(self.output_dir, 'model', 'openhub',
+                                'outside_project', str(project.id),
+                                'index.html')
+            with open(path) as f:
+                self.assertIn(project.name, f.read())
+
+    def test_render_to_dir_incremental(self):
+        urls = get_urls('outsideproject')
+        manifest = os.path.join(self.output_dir, 'manifest.json')
+        output = []
+        render_to_dir(self.output_dir, urls, output.append,
+                      manifest=manifest, inputs=distill_inputs)
+        self.assertIn('Rebuilt 4 of 4 pages', output)
+
+        project = OutsideProject.objects.first()
+        project.name = 'renamed'
+        project.save()
+        OutsideProject.objects.last().delete()
+        output = []
+        render_to_dir(self.output_dir, urls, output.append,
+                      manifest=manifest, inputs=distill_inputs)
+        self.assertIn('Rebuilt 2 of 3 pages', output)
+        rendered = [line for line in output
+                    if line.startswith('Rendering page: ')]
+        self.assertEqual(len(rendered), 2)
+        self.assertEqual(len([line for line in output
+                              if line.startswith('Removing page: ')]), 1)
+
+        # A change to the templates or the code rebuilds all pages
+        output = []
+        with mock.patch('community.distill.hash_code',
+                        return_value='changed'):
+            render_to_dir(self.output_dir, urls, output.append,
+                          manifest=manifest, inputs=distill_inputs)
+        self.assertIn('Rebuilt 3 of 3 pages', output)
+
+
+class ParallelDistillTest(TransactionTestCase):
+
+    def setUp(self):
+        for i in range(5):
+            OutsideProject.objects.create(name='project' + str(i),
+                                          activity='High', org='test')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = directory
+        self.log = os.path.join(directory, 'renders.log')
+
+    def distill(self, name, parallel):
+        """Run distill-local on the outside project views.
+
+        :return: Output directory, manifest and the pid rendering each
+                 page, by URI.
+        """
+        output_dir = os.path.join(self.directory, name)
+        manifest = os.path.join(self.directory, name + '.json')
+        command = import_module(
+            'community.management.commands.distill-local')
+
+        def logged_render_page(page):
+            with open(self.log, 'a') as f:
+                f.write('%s %s\n' % (page.uri, os.getpid()))
+            return render_page(page)
+
+        open(self.log, 'w').close()
+        with mock.patch.object(command, 'urls_to_distill',
+                               get_urls('outsideproject')), \
+                mock.patch('community.distill.render_page',
+                           logged_render_page):
+            call_command('distill-local', output_dir, '--quiet',
+                         '--parallel', str(parallel),
+                         '--manifest', manifest)
+        with open(self.log) as f:
+            pids = dict(line.split() for line in f)
+        return output_dir, manifest, pids
+
+    def read_pages(self, output_dir):
+        pages = {}
+        for root, dirs, files in os.walk(os.path.join(output_dir,
+                                                      'model')):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    pages[os.path.relpath(path, output_dir)] = f.read()
+        return pages
+
+    def test_parallel(self):
+        serial_dir, serial_manifest, _ = self.distill('serial', 1)
+        output_dir, manifest, pids = self.distill('parallel', 2)
+
+        parent = str(os.getpid())
+        first_detail = '/model/openhub/outside_project/%d/' % (
+            OutsideProject.objects.order_by('pk').first().pk)
+        self.assertEqual(pids['/model/openhub/outside_projects/'], parent)
+        self.assertEqual(pids[first_detail], parent)
+        workers = [pid for uri, pid in pids.items()
+                   if uri not in ('/model/openhub/outside_projects/',
+                                  first_detail)]
+        self.assertEqual(len(workers), 4)
+        self.assertNotIn(parent, workers)
+
+        self.assertEqual(self.read_pages(output_dir),
+                         self.read_pages(serial_dir))
+        self.assertEqual(len(self.read_pages(output_dir)), 6)
+        with open(serial_manifest) as f:
+            serial = json.load(f)
+        with open(manifest) as f:
+            self.assertEqual(json.load(f), serial)
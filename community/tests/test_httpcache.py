@@ -0,0 +1,85 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from community.httpcache import HTTPCache
+
+
+def make_response(status_code, content=b'', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class HTTPCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    @mock.patch('community.httpcache.requests.get')
+    def test_revalidate(self, get):
+        cache = HTTPCache(self.directory)
+        get.return_value = make_response(
+            200, b'{"issues": []}',
+            {'ETag': '"abc"', 'Content-Type': 'application/json'})
+        self.assertEqual(cache.get('http://example.com/a').json(),
+                         {'issues': []})
+
+        get.return_value = make_response(304)
+        response = cache.get('http://example.com/a')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{"issues": []}')
+        self.assertEqual(get.call_args[1]['headers'],
+                         {'If-None-Match': '"abc"'})
+        self.assertEqual(cache.stats['misses'], 1)
+        self.assertEqual(cache.stats['revalidated'], 1)
+
+    @mock.patch('community.httpcache.requests.get')
+    def test_max_age(self, get):
+        cache = HTTPCache(self.directory, max_age=60)
+        get.return_value = make_response(200, b'logo')
+        cache.get('http://example.com/logo.png')
+        self.assertEqual(cache.get('http://example.com/logo.png').content,
+                         b'logo')
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(cache.stats['hits'], 1)
+
+    @mock.patch('community.httpcache.requests.get')
+    def test_errors_not_cached(self, get):
+        cache = HTTPCache(self.directory)
+        get.return_value = make_response(404)
+        self.assertEqual(cache.get('http://example.com/a').status_code, 404)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @mock.patch('community.httpcache.requests.get')
+    def test_evict_max_size(self, get):
+        cache = HTTPCache(self.directory, max_size=10)
+        get.return_value = make_response(200, b'123456')
+        cache.get('http://example.com/a')
+        used = time.time() - 10
+        os.utime(os.path.join(self.directory, cache._key(
+            'http://example.com/a', None) + '.body'), (used, used))
+        cache.get('http://example.com/b')
+        self.assertEqual(cache.stats['evicted'], 1)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    @mock.patch('community.httpcache.requests.get')
+    def test_stream(self, get):
+        cache = HTTPCache(self.directory, max_age=60)
+        response = make_response(200)
+        response.raw = io.BytesIO(b'0123456789')
+        get.return_value = response
+        for _ in range(2):
+            response = cache.get('http://example.com/a', stream=True)
+            self.assertEqual(b''.join(response.iter_content(4)),
+                             b'0123456789')
+        self.assertEqual(cache.stats['hits'], 1)
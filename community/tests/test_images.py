@@ -0,0 +1,67 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from community.images import write_image_variants
+from gsoc.models import Organization as GsocOrganization
+
+
+def make_png(size):
+    f = io.BytesIO()
+    Image.new('RGBA', (size, size), (200, 20, 20, 255)).save(f, 'PNG')
+    return f.getvalue()
+
+
+class ImagesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_write_image_variants(self):
+        variants = {'favicon': (16, ('png', )),
+                    'logo': (0, ('png', 'webp'))}
+        filenames = write_image_variants(make_png(100), self.directory,
+                                         variants)
+        self.assertEqual(filenames['favicon'], {'png': 'favicon.png'})
+        self.assertEqual(filenames['logo'],
+                         {'png': 'logo.png', 'webp': 'logo.webp'})
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'favicon.webp')))
+        for filename, size in (('favicon.png', 16), ('logo.png', 100),
+                               ('logo.webp', 100)):
+            image = Image.open(os.path.join(self.directory, filename))
+            self.assertEqual(image.size, (size, size))
+
+        # Variants of the same image are not encoded again
+        path = os.path.join(self.directory, 'favicon.png')
+        os.utime(path, (0, 0))
+        with mock.patch('community.images.encode_image') as encode_image:
+            write_image_variants(make_png(100), self.directory, variants)
+        self.assertFalse(encode_image.called)
+        self.assertEqual(os.stat(path).st_mtime, 0)
+
+        # Those of another image are
+        write_image_variants(make_png(50), self.directory, variants)
+        self.assertEqual(Image.open(os.path.join(
+            self.directory, 'logo.png')).size, (50, 50))
+
+    def test_model_logos(self):
+        with open(os.path.join(self.directory, 'org.png'), 'wb') as f:
+            f.write(make_png(300))
+        output_dir = os.path.join(self.directory, 'site')
+
+        with override_settings(MEDIA_ROOT=self.directory):
+            self.assertIsNone(GsocOrganization().write_logos(output_dir))
+            filenames = GsocOrganization(logo='org.png').write_logos(
+                output_dir)
+
+        self.assertEqual(filenames['org_logo'],
+                         {'png': 'org_logo.png', 'webp': 'org_logo.webp'})
+        self.assertEqual(Image.open(os.path.join(
+            output_dir, 'favicon.png')).size, (16, 16))
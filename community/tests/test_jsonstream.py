@@ -0,0 +1,30 @@
+import json
+
+from django.test import SimpleTestCase
+
+from community.jsonstream import iter_json_array
+
+
+def split(document, size):
+    data = json.dumps(document).encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJSONArrayTest(SimpleTestCase):
+
+    def test_chunk_boundaries(self):
+        document = {
+            'labels': {'bug': [1, 2]},
+            'issues': [{'title': 'café'}, 15000000000.0, None, [], 'x'],
+            'after': True,
+        }
+        for size in (1, 2, 3, 5, 1000):
+            self.assertEqual(list(iter_json_array(split(document, size),
+                                                  'issues')),
+                             document['issues'])
+
+    def test_errors(self):
+        with self.assertRaises(KeyError):
+            list(iter_json_array(split({'labels': []}, 4), 'issues'))
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array([b'{"issues": [1, 2'], 'issues'))
@@ -0,0 +1,119 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from community.management.commands.build_site import Command
+from community.profiling import PhaseReport, format_report, run_phase
+from data.models import Contributor
+
+
+class RunPhaseTest(TestCase):
+
+    def test_run_phase(self):
+        def phase():
+            Contributor.objects.count()
+            Contributor.objects.count()
+            raise ValueError('failed')
+
+        report, error = run_phase('import', phase)
+        self.assertEqual(report.name, 'import')
+        self.assertEqual(report.sql_queries, 2)
+        self.assertEqual(report.http_requests, 0)
+        self.assertIsInstance(error, ValueError)
+        self.assertEqual(report.error, 'failed')
+        self.assertGreaterEqual(report.wall_time, 0)
+
+    def test_peak_rss(self):
+        def phase(size):
+            b'x' * (size * 1024 * 1024)
+
+        big, _ = run_phase('big', lambda: phase(100))
+        small, _ = run_phase('small', lambda: phase(0))
+        if big.peak_rss is None:
+            self.skipTest('The peak RSS cannot be reset')
+        self.assertGreater(big.peak_rss - small.peak_rss, 50)
+
+    @mock.patch('requests.Session.send')
+    def test_threads(self, send):
+        def phase():
+            with ThreadPoolExecutor(8) as executor:
+                list(executor.map(lambda _: requests.Session().send(None),
+                                  range(1000)))
+
+        report, error = run_phase('fetch', phase)
+        self.assertIsNone(error)
+        self.assertEqual(report.http_requests, 1000)
+
+
+class FormatReportTest(TestCase):
+
+    def test_format_report(self):
+        reports = [
+            PhaseReport('migrate', 1.5, 1.25, 50.0, 0, 12, 0.5, None),
+            PhaseReport('distill-local', 20.0, 80.0, None, 3, 1000, 2.0,
+                        None),
+        ]
+        lines = format_report(reports).split('\n')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Phase'))
+        self.assertEqual(set(lines[1]), {'-'})
+        self.assertEqual(lines[2].split(),
+                         ['migrate', '1.50', '1.25', '50.0', '0', '12',
+                          '0.50'])
+        self.assertEqual(lines[3].split(),
+                         ['distill-local', '20.00', '80.00', '-', '3',
+                          '1000', '2.00'])
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+
+
+class BuildSitePhasesTest(TestCase):
+
+    IMPORTS = ['import:contributors', 'import:organization',
+               'import:affiliated_committers', 'import:outside_committers',
+               'import:outside_projects', 'import:portfolio_projects']
+
+    @mock.patch.dict(os.environ, {'GCI_TOKEN': 'token'})
+    def test_gci_token(self):
+        phases = Command().get_phases({'output_dir': 'public'})
+        self.assertEqual(
+            [name for name, _, _, _ in phases],
+            ['migrate'] + self.IMPORTS
+            + ['import:gci_tasks', 'import:gci_instances',
+               'cleanse_gci_task_data', 'collectstatic', 'distill-local'])
+        self.assertEqual(phases[-4][1:], (
+            'import_all_data', (),
+            {'gci_dir': 'private', 'sources': ['gci_instances']}))
+
+    def test_deployed_data(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('GCI_TOKEN', None)
+            phases = Command().get_phases({'output_dir': 'public',
+                                           'parallel': 4,
+                                           'manifest': 'manifest.json'})
+        self.assertEqual([name for name, _, _, _ in phases],
+                         ['migrate', 'fetch_deployed_data'] + self.IMPORTS
+                         + ['collectstatic', 'distill-local'])
+        self.assertEqual(phases[2][1:], (
+            'import_all_data', (), {'sources': ['contributors']}))
+        self.assertEqual(phases[-1][2], ('public', ))
+        self.assertEqual(phases[-1][3], {'force': True, 'parallel': 4,
+                                         'manifest': 'manifest.json'})
+
+
+class ImportAllDataTest(TestCase):
+
+    @mock.patch('community.management.commands.import_all_data.acquire',
+                return_value={'contributors': 2})
+    def test_sources(self, acquire):
+        call_command('import_all_data', sources=['contributors'],
+                     stdout=io.StringIO())
+        self.assertEqual([source.name for source in acquire.call_args[0][0]],
+                         ['contributors'])
+
+        with self.assertRaisesRegex(CommandError, 'Unknown sources twitter'):
+            call_command('import_all_data', sources=['twitter'])
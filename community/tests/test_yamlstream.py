@@ -0,0 +1,56 @@
+import io
+from collections import OrderedDict
+from unittest import mock
+
+from django.test import SimpleTestCase
+from ruamel.yaml import YAML
+
+from community import yamlstream
+from community.yamlstream import dump_yaml_items, iter_yaml_items
+
+
+def dump(data):
+    stream = io.StringIO()
+    YAML().dump(data, stream)
+    return stream.getvalue()
+
+
+class YAMLStreamTest(SimpleTestCase):
+
+    data = OrderedDict([
+        (3, {'id': 3, 'tags': ['a', 'b'], 'description': 'line\n' * 3}),
+        (1, {'id': 1, 'tags': [], 'modified': '2017-12-01T10:00:00Z'}),
+        (2, {'id': 2, 'tags': None}),
+    ])
+
+    @mock.patch.object(yamlstream, 'BATCH_SIZE', 2)
+    def test_iter_yaml_items(self):
+        for document in (dump(self.data), dump(dict(self.data)),
+                         '---\n' + dump(dict(self.data))):
+            with mock.patch.object(yamlstream.YAML, 'load', autospec=True,
+                                   side_effect=YAML.load) as load:
+                self.assertEqual(
+                    list(iter_yaml_items(io.StringIO(document))),
+                    list(self.data.items()))
+            # The three entries are parsed in two batches
+            self.assertEqual(load.call_count, 2)
+
+        self.assertEqual(
+            list(iter_yaml_items(io.StringIO('{3: {id: 3}, 1: {}}\n'))),
+            [(3, {'id': 3}), (1, {})])
+        self.assertEqual(list(iter_yaml_items(io.StringIO('{}\n'))), [])
+
+    @mock.patch.object(yamlstream, 'BATCH_SIZE', 2)
+    def test_dump_yaml_items(self):
+        expected = dump(dict(self.data))
+        stream = io.StringIO()
+        with mock.patch.object(yamlstream.YAML, 'dump', autospec=True,
+                               side_effect=YAML.dump) as yaml_dump:
+            dump_yaml_items(self.data.items(), stream)
+        self.assertEqual(yaml_dump.call_count, 2)
+        self.assertEqual(stream.getvalue(), expected)
+
+        stream = io.StringIO()
+        dump_yaml_items([], stream)
+        self.assertEqual(list(iter_yaml_items(io.StringIO(
+            stream.getvalue()))), [])
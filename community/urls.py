@@ -2,18 +2,23 @@
 Community URL configuration.
 """
 
+import os.path
+
 from django_distill import distill_url
 from django.conf.urls.static import static
 from django.conf import settings
 from django.views.generic import TemplateView
 
+from community.distill import hash_files, hash_queryset
 from community.views import info
 from gci.views import index as gci_index
-from gci.feeds import LatestTasksFeed as gci_tasks_rss
+from gci.feeds import LatestTasksFeed as gci_tasks_rss, get_feeds
 from activity.scraper import activity_json
 from twitter.view_twitter import index as twitter_index
 from log.view_log import index as log_index
+from data.models import Contributor
 from data.views import index as contributors_index
+from meta_review.models import Participant
 from meta_review.views import index as meta_review_index
 from inactive_issues.inactive_issues_scraper import inactive_issues_json
 from openhub.views import index as openhub_index
@@ -48,6 +53,24 @@ def get_index():
     return None
 
 
+def get_gci_task_feeds(kind):
+    try:
+        feeds = get_feeds()
+    except FileNotFoundError:
+        return
+    for feed_kind, value in feeds:
+        if feed_kind == kind:
+            yield {kind: value}
+
+
+def get_gci_task_tags():
+    return get_gci_task_feeds('tag')
+
+
+def get_gci_task_categories():
+    return get_gci_task_feeds('category')
+
+
 def get_all_portfolioprojects():
     for portfolioproject in PortfolioProject.objects.all():
         yield {'pk': portfolioproject.id}
@@ -73,6 +96,51 @@ def get_organization():
         yield {'pk': organization.id}
 
 
+def no_inputs():
+    return ''
+
+
+def all_rows(model):
+    return lambda: hash_queryset(model.objects.all())
+
+
+def one_row(model):
+    return lambda pk: hash_queryset(model.objects.filter(pk=pk))
+
+
+def site_files(*filenames):
+    return lambda **params: hash_files(
+        *(os.path.join(settings.STATIC_ROOT, filename)
+          for filename in filenames))
+
+
+# Functions hashing everything a page is rendered from, by view name.
+# Pages of views not listed here depend on upstream services, and are
+# rendered on every build.
+distill_inputs = {
+    'index': no_inputs,
+    'activity': no_inputs,
+    'gci-tasks-rss': site_files('tasks.yaml'),
+    'gci-tasks-tag-rss': site_files('tasks.yaml'),
+    'gci-tasks-category-rss': site_files('tasks.yaml'),
+    'log': site_files('community.log'),
+    'community-data': all_rows(Contributor),
+    'meta_review_data': all_rows(Participant),
+    'community-openhub': all_rows(PortfolioProject),
+    'community-model': no_inputs,
+    'outsidecommitters': all_rows(OutsideCommitter),
+    'outsidecommitter-detail': one_row(OutsideCommitter),
+    'outsideprojects': all_rows(OutsideProject),
+    'outsideproject-detail': one_row(OutsideProject),
+    'affiliatedcommitters': all_rows(AffiliatedCommitter),
+    'affiliatedcommitter-detail': one_row(AffiliatedCommitter),
+    'portfolioprojects': all_rows(PortfolioProject),
+    'portfolioproject-detail': one_row(PortfolioProject),
+    'organization': all_rows(Organization),
+    'org-detail': one_row(Organization),
+}
+
+
 urlpatterns = [
     distill_url(
         r'^$', TemplateView.as_view(template_name='index.html'),
@@ -82,7 +150,7 @@ urlpatterns = [
     ),
     distill_url(
         'info.txt', info,
-        name='index',
+        name='info',
         distill_func=get_index,
         distill_file='info.txt',
     ),
@@ -104,6 +172,16 @@ urlpatterns = [
         distill_func=get_index,
         distill_file='gci/tasks/rss.xml',
     ),
+    distill_url(
+        r'gci/tasks/tag/(?P<tag>[-\w]+)/rss.xml', gci_tasks_rss(),
+        name='gci-tasks-tag-rss',
+        distill_func=get_gci_task_tags,
+    ),
+    distill_url(
+        r'gci/tasks/category/(?P<category>\d+)/rss.xml', gci_tasks_rss(),
+        name='gci-tasks-category-rss',
+        distill_func=get_gci_task_categories,
+    ),
     distill_url(
         r'gci/', gci_index,
         name='community-gci',
@@ -0,0 +1,98 @@
+import itertools
+
+from ruamel.yaml import YAML
+
+# Number of entries parsed or dumped at once
+BATCH_SIZE = 1000
+
+# Lines which may precede the top-level collection of a document
+DIRECTIVE_PREFIXES = ('%', '---')
+
+
+def _batches(iterable, size=None):
+    """
+    :param size: Number of items of each batch, ``BATCH_SIZE`` by default.
+    """
+    size = size or BATCH_SIZE
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _iter_entries(lines):
+    """Group the lines of the top-level collection of a block style
+    document into its entries, each of which starts at the first column.
+    """
+    entry = []
+    for line in lines:
+        if line.startswith('...'):
+            break
+        if line[:1] not in ' \t\r\n#' and entry:
+            yield ''.join(entry)
+            entry = []
+        entry.append(line)
+    if entry:
+        yield ''.join(entry)
+
+
+def iter_yaml_items(lines):
+    """Yield the key and value pairs of the top-level mapping, or ordered
+    map, of a YAML document as they are parsed.
+
+    Entries are parsed a batch at a time with the safe loader, so memory
+    use does not grow with the size of a block style document. Other
+    documents are parsed at once.
+
+    :param lines: Iterable of the lines of the document, e.g. a file.
+    :return:      Generator of the key and value pairs.
+    """
+    lines = iter(lines)
+    yaml = YAML(typ='safe')
+    ordered = False
+    for line in lines:
+        if line.startswith(DIRECTIVE_PREFIXES):
+            line = line.split('---', 1)[-1]
+        tag = line.strip()
+        if tag == '!!omap':
+            ordered = True
+        elif tag and not tag.startswith('#'):
+            lines = itertools.chain([line], lines)
+            break
+
+    line = next(lines, '')
+    lines = itertools.chain([line], lines)
+    if line.lstrip()[:1] in '{[':
+        data = yaml.load(''.join(lines))
+        if isinstance(data, list):
+            for entry in data:
+                yield from entry.items()
+        elif data:
+            yield from data.items()
+        return
+
+    for batch in _batches(_iter_entries(lines)):
+        data = yaml.load(''.join(batch))
+        if ordered:
+            for entry in data:
+                yield from entry.items()
+        else:
+            yield from data.items()
+
+
+def dump_yaml_items(items, stream):
+    """Write key and value pairs as a block style YAML mapping, a batch at
+    a time.
+
+    :param items:  Iterable of the key and value pairs, with unique keys.
+    :param stream: File to write the document to.
+    """
+    yaml = YAML()
+    empty = True
+    for batch in _batches(items):
+        yaml.dump(dict(batch), stream)
+        empty = False
+    if empty:
+        yaml.dump({}, stream)
@@ -1,8 +1,7 @@
 import logging
 
-import requests
-
 from community.git import get_org_name
+from community.httpcache import cached_get
 from data.models import Contributor
 
 
@@ -11,8 +10,8 @@ def get_contrib_data():
     IMPORT_URL = 'https://webservices.' + get_org_name() + '.io/contrib/'
     headers = {'Content-Type': 'application/json'}
     try:
-        response = requests.get(
-            url=IMPORT_URL,
+        response = cached_get(
+            IMPORT_URL,
             headers=headers,
         )
         response.raise_for_status()
@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import time
+from urllib.parse import urlparse
+
+from .client import GCIAPIClient
+
+# Rate limiters shared by the clients of each host and rate
+_rate_limiters = {}
+
+
+class RateLimiter():
+    """
+    Spaces out the requests to a host, at most ``rate`` per second, from
+    any thread.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_rate_limiter(url, rate):
+    key = (urlparse(url).netloc, rate)
+    if key not in _rate_limiters:
+        _rate_limiters[key] = RateLimiter(rate)
+    return _rate_limiters[key]
+
+
+class AsyncGCIAPIClient():
+    """
+    An asyncio counterpart of ``GCIAPIClient``, whose methods are
+    coroutines.
+
+    Requests are sent by a ``GCIAPIClient`` in a pool of ``concurrency``
+    threads, so they share its keep-alive connections and retries. At most
+    ``rate`` of them are started per second to the host, by all clients
+    with that rate.
+
+    Example usage:
+
+    client = AsyncGCIAPIClient(auth_token='xxxxxxxxxxxxxx')
+    tasks = loop.run_until_complete(client.GetTasks([1, 2, 3]))
+    """
+
+    def __init__(self, auth_token=None,
+                 url_prefix='https://codein.withgoogle.com/',
+                 concurrency=10, rate=20, **kwargs):
+        """
+        Constructs a new ``AsyncGCIAPIClient``
+
+        :param concurrency: Number of requests sent at the same time.
+        :param rate:        Number of requests started per second.
+        :param kwargs:      Other arguments of ``GCIAPIClient``.
+        """
+        self.client = GCIAPIClient(auth_token, url_prefix,
+                                   pool_size=concurrency, **kwargs)
+        self.rate_limiter = get_rate_limiter(url_prefix, rate)
+        # The threads limit the requests in flight
+        self.executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+
+    def _send(self, name, *args):
+        # Waiting in the thread spaces out the requests as they start
+        self.rate_limiter.wait()
+        return getattr(self.client, name)(*args)
+
+    async def _call(self, name, *args):
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, functools.partial(self._send, name, *args))
+
+    async def ListTasks(self, page=1):
+        return await self._call('ListTasks', page)
+
+    async def GetTask(self, task_id):
+        return await self._call('GetTask', task_id)
+
+    async def NewTask(self, task):
+        return await self._call('NewTask', task)
+
+    async def UpdateTask(self, task_id, task):
+        return await self._call('UpdateTask', task_id, task)
+
+    async def DeleteTask(self, task_id):
+        return await self._call('DeleteTask', task_id)
+
+    async def ListTaskInstances(self, page=1):
+        return await self._call('ListTaskInstances', page)
+
+    async def GetTaskInstance(self, task_instance_id):
+        return await self._call('GetTaskInstance', task_instance_id)
+
+    async def GetTasks(self, task_ids):
+        """
+        Fetch many tasks concurrently.
+
+        :return: List of the tasks, in the order of the ids.
+        :raises HTTPError: If fetching any of the tasks failed.
+        """
+        return await asyncio.gather(
+            *[self.GetTask(task_id) for task_id in task_ids])
+
+    async def GetTaskInstances(self, task_instance_ids):
+        """
+        Fetch many task instances concurrently.
+
+        :return: List of the task instances, in the order of the ids.
+        :raises HTTPError: If fetching any of the task instances failed.
+        """
+        return await asyncio.gather(
+            *[self.GetTaskInstance(task_instance_id)
+              for task_instance_id in task_instance_ids])
+
+    def close(self):
+        self.executor.shutdown()
+        self.client.session.close()
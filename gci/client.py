@@ -24,9 +24,12 @@ client = gciclient.GCIAPIClient(
 client.NewTask(myTaskDict)
 """
 
+import collections
 import json
 import logging
 import sys
+import threading
+import time
 
 if sys.version_info[0] == 2:
     import urlparse
@@ -35,6 +38,11 @@ else:
 
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Responses retried with exponential backoff, honouring Retry-After
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 
 class GCIAPIClient(object):
@@ -43,19 +51,40 @@ class GCIAPIClient(object):
   A GCIAPIClient simplifies working with tasks by forming the HTTP requests on
   behalf of the caller.
 
+  Requests are sent through a session keeping connections alive, and are
+  retried on rate limiting and server errors.
+
   Attributes:
     url_prefix: A string prefix for the codin URL
     headers: A dictionary of HTTP headers
+    timeout: Seconds to wait to connect and for each read
+    latency: A dictionary of method name to the number of requests, and the
+      total and maximum seconds they took
   """
 
   def __init__(self, auth_token=None,
                url_prefix='https://codein.withgoogle.com/',
-               debug=False):
+               debug=False, pool_size=10, timeout=(10, 60), retries=5,
+               backoff_factor=0.5):
     self.url_prefix = urlparse.urljoin(url_prefix, 'api/program/current/')
     self.headers = {
         'Authorization': 'Bearer %s' % auth_token,
         'Content-Type': 'application/json',
     }
+    self.timeout = timeout
+    self.latency = collections.defaultdict(
+        lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+    self._latency_lock = threading.Lock()
+
+    # POST is not retried, as it may create a task twice
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUSES, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    self.session = requests.Session()
+    self.session.headers.update(self.headers)
+    self.session.mount('http://', adapter)
+    self.session.mount('https://', adapter)
 
     if debug:
       logging.basicConfig()
@@ -67,6 +96,26 @@ class GCIAPIClient(object):
   def _Url(self, path):
     return urlparse.urljoin(self.url_prefix, path) + '/'
 
+  def _Request(self, name, method, path, **kwargs):
+    """Sends a request, recording its latency under the method name.
+
+    Raises:
+      HTTPError: a 4XX client error or 5XX server error response was returned.
+    """
+    start = time.time()
+    try:
+      r = self.session.request(method, self._Url(path), timeout=self.timeout,
+                               **kwargs)
+    finally:
+      elapsed = time.time() - start
+      with self._latency_lock:
+        latency = self.latency[name]
+        latency['count'] += 1
+        latency['total'] += elapsed
+        latency['max'] = max(latency['max'], elapsed)
+    r.raise_for_status()
+    return r
+
   def ListTasks(self, page=1):
     """Fetches a list of tasks.
 
@@ -79,9 +128,7 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = requests.get(self._Url('tasks'), headers=self.headers,
-                     params={'page': page})
-    r.raise_for_status()
+    r = self._Request('ListTasks', 'GET', 'tasks', params={'page': page})
     return r.json()
 
   def GetTask(self, task_id):
@@ -96,8 +143,7 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = requests.get(self._Url('tasks/%d' % task_id), headers=self.headers)
-    r.raise_for_status()
+    r = self._Request('GetTask', 'GET', 'tasks/%d' % task_id)
     return r.json()
 
   def NewTask(self, task):
@@ -112,9 +158,7 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = requests.post(self._Url('tasks'), headers=self.headers,
-                      data=json.dumps(task))
-    r.raise_for_status()
+    r = self._Request('NewTask', 'POST', 'tasks', data=json.dumps(task))
     return r.json()
 
   def UpdateTask(self, task_id, task):
@@ -130,11 +174,8 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = (
-        requests.put(
-            self._Url('tasks/%d' % task_id), data=json.dumps(task),
-            headers=self.headers))
-    r.raise_for_status()
+    r = self._Request('UpdateTask', 'PUT', 'tasks/%d' % task_id,
+                      data=json.dumps(task))
     return r.json()
 
   def DeleteTask(self, task_id):
@@ -150,11 +191,7 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = (
-        requests.delete(
-            self._Url('tasks/%d' % task_id),
-            headers=self.headers))
-    r.raise_for_status()
+    r = self._Request('DeleteTask', 'DELETE', 'tasks/%d' % task_id)
     # DELETE returns nothing on success, don't try and parse it.
     if r.content:
       return r.json()
@@ -172,9 +209,8 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = requests.get(self._Url('instances'), headers=self.headers,
-                     params={'page': page})
-    r.raise_for_status()
+    r = self._Request('ListTaskInstances', 'GET', 'instances',
+                      params={'page': page})
     return r.json()
 
   def GetTaskInstance(self, task_instance_id):
@@ -189,7 +225,6 @@ class GCIAPIClient(object):
     Raises:
       HTTPError: a 4XX client error or 5XX server error response was returned.
     """
-    r = requests.get(self._Url('instances/%d' % task_instance_id),
-                     headers=self.headers)
-    r.raise_for_status()
+    r = self._Request('GetTaskInstance', 'GET',
+                      'instances/%d' % task_instance_id)
     return r.json()
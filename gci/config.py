@@ -1,11 +1,18 @@
-import ruamel.yaml
+import hashlib
+import logging
 import os
-from community.settings import STATIC_ROOT
+import pickle
+import tempfile
+
+import ruamel.yaml
+from ruamel.yaml import YAML
+from community.settings import GCI_COMPILED_CACHE_DIR, STATIC_ROOT
 from community.config import get_api_key
 
 
 __all__ = (
     'GCI_DATA_DIR',
+    'dump_cache',
     'get_api_key',
     'load_cache',
 )
@@ -15,7 +22,95 @@ GCI_DATA_DIR = os.path.join(
     STATIC_ROOT,
 )
 
+# Version of the format of the compiled caches, to be increased when it
+# changes
+COMPILED_VERSION = 1
+
+
+def _get_compiled_path(path):
+    """
+    :return: Path of the compiled cache of the YAML file, keyed by its
+             absolute path.
+    """
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(GCI_COMPILED_CACHE_DIR, key + '.pickle')
+
+
+def _get_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def _load_compiled(path, stat):
+    """
+    :return: The data of the compiled cache of the YAML file, or None if
+             it is missing or outdated.
+    """
+    try:
+        with open(_get_compiled_path(path), 'rb') as f:
+            compiled = pickle.load(f)
+        if compiled.get('version') != COMPILED_VERSION:
+            return None
+    # A cache written by older code, or a corrupt one, can fail to load
+    # with any exception
+    except Exception:
+        return None
+    if (compiled['mtime'] == stat.st_mtime_ns
+            and compiled['size'] == stat.st_size):
+        return compiled['data']
+    # The file may have been touched without being changed, e.g. by a
+    # checkout
+    with open(path, 'rb') as f:
+        if _get_hash(f.read()) == compiled['hash']:
+            _dump_compiled(compiled['data'], path)
+            return compiled['data']
+    return None
+
+
+def _dump_compiled(data, path):
+    """Write the compiled cache of the data loaded from the YAML file."""
+    logger = logging.getLogger(__name__)
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        content_hash = _get_hash(f.read())
+    compiled = {
+        'version': COMPILED_VERSION,
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'hash': content_hash,
+        'data': data,
+    }
+    try:
+        os.makedirs(GCI_COMPILED_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=GCI_COMPILED_CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _get_compiled_path(path))
+    except OSError as e:
+        logger.warning('Unable to write the compiled cache of %s: %s'
+                       % (path, e))
+
+
+def load_cache(filename, directory=GCI_DATA_DIR):
+    """
+    Load a YAML file, from its compiled cache if it is up to date.
+
+    The compiled cache is written to ``GCI_COMPILED_CACHE_DIR``, and used
+    as long as the modification time and size, or else the hash, of the
+    file match.
+    """
+    path = os.path.join(directory, filename)
+    data = _load_compiled(path, os.stat(path))
+    if data is not None:
+        return data
+    with open(path, 'r') as f:
+        data = ruamel.yaml.load(f, Loader=ruamel.yaml.Loader)
+    _dump_compiled(data, path)
+    return data
+
 
-def load_cache(filename):
-    with open(os.path.join(GCI_DATA_DIR, filename), 'r') as f:
-        return ruamel.yaml.load(f, Loader=ruamel.yaml.Loader)
+def dump_cache(data, filename, directory=GCI_DATA_DIR):
+    yaml = YAML()
+    path = os.path.join(directory, filename)
+    with open(path, 'w') as f:
+        yaml.dump(data, f)
+    _dump_compiled(data, path)
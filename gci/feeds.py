@@ -1,37 +1,168 @@
-import os.path
-from ruamel.yaml import YAML
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+
 import markdown2
 import dateutil.parser
 
+from django.conf import settings
 from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.utils.text import slugify
 from community.git import get_deploy_url, get_org_name
 
+from .config import GCI_DATA_DIR, load_cache
+
+# Number of the most recently modified tasks in each feed
+FEED_SIZE = 100
+
+CATEGORIES = {
+    1: 'Coding',
+    2: 'User Interface',
+    3: 'Documentation & Training',
+    4: 'Quality Assurance',
+    5: 'Outreach & Research',
+}
+
+# Key of the feed of all tasks
+ALL_TASKS = ('all', '')
+
+# Tasks of each feed by its key, and the file status of tasks.yaml they
+# were selected from
+_feeds = {}
+_feeds_stat = None
+
+# Rendered descriptions of tasks, by hash of their content
+_descriptions = None
+
+
+def get_feed_keys(task):
+    """
+    :return: Keys of the feeds listing the task.
+    """
+    yield ALL_TASKS
+    for tag in set(slugify(tag) for tag in task['tags']):
+        if tag:
+            yield ('tag', tag)
+    for category in task['categories']:
+        yield ('category', category)
+
+
+def select_feeds(tasks, size=FEED_SIZE):
+    """Select the most recently modified tasks of every feed in one pass.
+
+    :param tasks: Iterable of tasks.
+    :return:      Dict of each feed key to its tasks, the latest first.
+    """
+    heaps = {}
+    for task in tasks:
+        entry = (task['last_modified'], task['id'], task)
+        for key in get_feed_keys(task):
+            heap = heaps.setdefault(key, [])
+            if len(heap) < size:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    return dict((key, [task for _, _, task in sorted(heap, reverse=True)])
+                for key, heap in heaps.items())
+
+
+def get_description_source(task):
+    desc = task['description']
+    if task['external_url']:
+        desc += '\n\nExternal URL: [{url}]({url})'.format(
+            url=task['external_url'])
+    return desc
+
+
+def render_descriptions(tasks, path):
+    """Render the descriptions of the tasks, reusing those rendered by
+    earlier builds, and keep only those of the tasks in the file.
+
+    :return: Dict of the hash of each description to its HTML.
+    """
+    try:
+        with open(path) as f:
+            rendered = json.load(f)
+    except (IOError, ValueError):
+        rendered = {}
+
+    descriptions = {}
+    for task in tasks:
+        source = get_description_source(task)
+        key = hashlib.sha1(source.encode()).hexdigest()
+        if key not in descriptions:
+            descriptions[key] = (rendered.get(key)
+                                 or markdown2.markdown(source))
+
+    if descriptions != rendered:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(descriptions, f)
+        os.replace(tmp_path, path)
+    return descriptions
+
+
+def get_feeds():
+    """
+    :return: Dict of each feed key to its tasks, selected again only when
+             tasks.yaml changes.
+    """
+    global _feeds, _feeds_stat, _descriptions
+    stat = os.stat(os.path.join(GCI_DATA_DIR, 'tasks.yaml'))
+    if (stat.st_mtime_ns, stat.st_size) != _feeds_stat:
+        _feeds = select_feeds(load_cache('tasks.yaml').values())
+        selected = dict((task['id'], task)
+                        for tasks in _feeds.values() for task in tasks)
+        _descriptions = render_descriptions(
+            selected.values(), settings.GCI_FEED_DESCRIPTIONS_FILE)
+        _feeds_stat = (stat.st_mtime_ns, stat.st_size)
+    return _feeds
+
 
 class LatestTasksFeed(Feed):
-    title = 'GCI tasks feed'
-    link = get_deploy_url() + '/gci/tasks/rss.xml'
     description = 'GCI tasks ordered by modification time.'
     author_name = get_org_name()
     author_link = get_deploy_url()
 
-    def items(self):
-        yaml = YAML()
-        with open(os.path.join('_site', 'tasks.yaml')) as f:
-            res = list(yaml.load(f).values())
+    def get_object(self, request, tag=None, category=None):
+        if tag is not None:
+            key = ('tag', tag)
+        elif category is not None:
+            key = ('category', int(category))
+        else:
+            key = ALL_TASKS
+        if key != ALL_TASKS and key not in get_feeds():
+            raise Http404('No GCI tasks feed %s %s' % key)
+        return key
+
+    def title(self, obj):
+        kind, value = obj
+        if kind == 'tag':
+            return 'GCI tasks feed: %s' % value
+        elif kind == 'category':
+            return 'GCI tasks feed: %s' % CATEGORIES.get(value, value)
+        return 'GCI tasks feed'
 
-        res.sort(key=lambda x: x['last_modified'], reverse=True)
+    def link(self, obj):
+        kind, value = obj
+        if kind == 'all':
+            return get_deploy_url() + '/gci/tasks/rss.xml'
+        return get_deploy_url() + '/gci/tasks/%s/%s/rss.xml' % obj
 
-        return res
+    def items(self, obj):
+        return get_feeds().get(obj, [])
 
     def item_title(self, item):
         return item['name']
 
     def item_description(self, item):
-        desc = item['description']
-        if item['external_url']:
-            desc += '\n\nExternal URL: [{url}]({url})'.format(
-                url=item['external_url'])
-        return markdown2.markdown(desc)
+        source = get_description_source(item)
+        return _descriptions[hashlib.sha1(source.encode()).hexdigest()]
 
     def item_link(self, item):
         return 'https://codein.withgoogle.com/tasks/' + str(item['id'])
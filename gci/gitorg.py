@@ -1,10 +1,44 @@
 import collections
+import concurrent.futures
+import datetime
+import email.utils
+import json
+import os
 import re
 import logging
+import tempfile
+import time
+from urllib.parse import quote_plus
 
+import dateutil.parser
 import requests
+from django.conf import settings
+from IGitt.GitHub.GitHub import GitHubToken
+from IGitt.Interfaces import get, post
 
-from community.git import get_irepo
+from community.config import TokenMissing, get_api_key
+from community.git import get_ihoster, get_irepo, get_repo_slug, get_token
+from community.httpcache import cached_get
+from community.images import LOGO_VARIANTS, write_image_variants
+
+ISSUE_URL = re.compile(r'https://(github|gitlab)\.com/'
+                       r'([^/]+)/(.+)/issues/(\d+)')
+
+# Number of issues looked up by each request of the bulk lookups
+ISSUE_BATCH_SIZE = 50
+
+GITHUB_ISSUE_QUERY = '''
+  i%(number)d: issue(number: %(number)d) {
+    updatedAt
+    assignees(first: 10) { nodes { login } }
+    timelineItems(itemTypes: [CLOSED_EVENT], last: 1) {
+      nodes {
+        ... on ClosedEvent {
+          closer { ... on PullRequest { author { login } } }
+        }
+      }
+    }
+  }'''
 
 
 # Matches structure of git-url-parse
@@ -15,6 +49,25 @@ IssueRepoUrl = collections.namedtuple('Parsed', [
     'name',
 ])
 
+# Users an issue was solved by, as of its last update
+LinkedUsers = collections.namedtuple('LinkedUsers', [
+    'updated',
+    'assignees',
+    'mr_author',
+])
+
+LINKED_USERS_VERSION = 1
+
+GITHUB_API_URL = 'https://api.github.com'
+
+# Number of GitHub users looked up by each GraphQL query
+USER_BATCH_SIZE = 100
+
+# Number of GitHub users looked up at the same time without a token
+USER_WORKERS = 8
+
+GITHUB_USERS_VERSION = 1
+
 _repos = {}
 
 
@@ -24,26 +77,29 @@ def get_repo(url):
     return _repos[url]
 
 
+def parse_issue_url(url):
+    """
+    :return: ``IssueRepoUrl`` of the repository and number of the issue,
+             or None if the URL is not an issue.
+    """
+    match = ISSUE_URL.match(url)
+    if not match:
+        return None
+    resource, org_name, repo_name, issue_number = match.groups()
+    return (IssueRepoUrl(resource + '.com', org_name, org_name, repo_name),
+            int(issue_number))
+
+
 def get_issue(url):
     logger = logging.getLogger(__name__ + '.get_issue')
-    match = re.match(r'https://(github|gitlab)\.com/'
-                     r'([^/]+)/(.+)/issues/(\d+)',
-                     url)
-    if not match:
+    parsed = parse_issue_url(url)
+    if not parsed:
         logger.info('not an issue %s' % url)
         return
 
-    resource = match.group(1) + '.com'
-    org_name = match.group(2)
-    repo_name = match.group(3)
-    issue_number = match.group(4)
-
-    issue_url = IssueRepoUrl(
-        resource,
-        org_name,
-        org_name,
-        repo_name,
-    )
+    issue_url, issue_number = parsed
+    org_name = issue_url.owner
+    repo_name = issue_url.name
 
     try:
         repo = get_repo(issue_url)
@@ -51,17 +107,314 @@ def get_issue(url):
         logger.error('Unable to load %s repo %s: %s' % (org_name, repo_name, e))
         return
     try:
-        issue = repo.get_issue(int(issue_number))
+        issue = repo.get_issue(issue_number)
     except Exception as e:
         logger.error('Unable to load issue %s' % url)
         return
     return issue
 
 
-def get_logo(org_name, size=0):
-    if size != 0:
-        image_url = 'http://github.com/%s.png?size=%s' % (org_name, size)
+def _format_time(time):
+    """
+    :param time: Datetime, aware or naive in UTC, or its ISO 8601 string.
+    :return: ISO 8601 string of the time in UTC in whole seconds, without
+             a UTC offset, as the ``updated`` time of ``LinkedUsers``.
+    :raises ValueError: If the string is not a time.
+    """
+    if isinstance(time, str):
+        try:
+            time = dateutil.parser.parse(time)
+        except OverflowError as e:
+            raise ValueError(e)
+    if time.tzinfo:
+        time = time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return time.replace(microsecond=0).isoformat()
+
+
+def _is_github_issue_unmodified(repo_url, number, cached):
+    """
+    Check with a conditional request whether a GitHub issue is unchanged
+    since it was resolved. A 304 response does not count against the rate
+    limit of the GitHub API.
+
+    :param repo_url: ``IssueRepoUrl`` of the repository.
+    :param cached:   ``LinkedUsers`` of the issue, updated at a UTC time.
+    :return: Whether the issue is known to be unchanged.
+    """
+    try:
+        updated = datetime.datetime.strptime(_format_time(cached.updated),
+                                             '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        return False
+    headers = {'If-Modified-Since': email.utils.format_datetime(
+        updated.replace(tzinfo=datetime.timezone.utc), usegmt=True)}
+    try:
+        headers['Authorization'] = 'token %s' % get_api_key('GH')
+    except TokenMissing:
+        pass
+    try:
+        r = requests.get('%s/repos/%s/%s/issues/%d'
+                         % (GITHUB_API_URL, repo_url.owner, repo_url.name,
+                            number),
+                         headers=headers)
+    except requests.RequestException:
+        return False
+    return r.status_code == 304
+
+
+def get_linked_users(url, cached=None):
+    """
+    Get the usernames of the assignees of an issue and, unless there is
+    exactly one of them, of the author of a merge request closing it.
+
+    :param cached: ``LinkedUsers`` of the issue resolved earlier, returned
+                   as is if the issue has not been updated since then,
+                   which is checked with a conditional request on GitHub.
+    :return: ``LinkedUsers``, or None if the issue could not be loaded.
+    """
+    parsed = parse_issue_url(url)
+    if (cached and parsed and parsed[0].resource == 'github.com'
+            and _is_github_issue_unmodified(parsed[0], parsed[1], cached)):
+        return cached
+    issue = get_issue(url)
+    if not issue:
+        return None
+    updated = _format_time(issue.updated)
+    if cached and cached.updated == updated:
+        return cached
+
+    assignees = sorted(user.username for user in issue.assignees)
+    mr_author = None
+    if len(assignees) != 1:
+        mrs = list(issue.mrs_closed_by)
+        if mrs:
+            mr_author = mrs[0].author.username
+    return LinkedUsers(updated, assignees, mr_author)
+
+
+def _get_github_linked_users(hoster, token, repo_url, numbers, cached):
+    # The GraphQL API cannot be used anonymously
+    if not token.value:
+        return {}
+
+    linked_users = {}
+    for start in range(0, len(numbers), ISSUE_BATCH_SIZE):
+        batch = numbers[start:start + ISSUE_BATCH_SIZE]
+        query = 'query { repository(owner: %s, name: %s) {%s} }' % (
+            json.dumps(repo_url.owner), json.dumps(repo_url.name),
+            ''.join(GITHUB_ISSUE_QUERY % {'number': number}
+                    for number in batch))
+        result = post(token, hoster.absolute_url('/graphql'),
+                      {'query': query})
+        # Numbers which are not issues are reported as errors, and the
+        # other issues are still returned
+        repository = (result.get('data') or {}).get('repository') or {}
+        for number in batch:
+            issue = repository.get('i%d' % number)
+            if not issue:
+                continue
+            updated = _format_time(issue['updatedAt'])
+            if cached.get(number) and cached[number].updated == updated:
+                linked_users[number] = cached[number]
+                continue
+
+            assignees = sorted(assignee['login']
+                               for assignee in issue['assignees']['nodes'])
+            mr_author = None
+            if len(assignees) != 1:
+                for event in issue['timelineItems']['nodes']:
+                    closer = event.get('closer') or {}
+                    if closer.get('author'):
+                        mr_author = closer['author']['login']
+            linked_users[number] = LinkedUsers(updated, assignees, mr_author)
+    return linked_users
+
+
+def _get_gitlab_linked_users(hoster, token, repo_url, numbers, cached):
+    project_url = '/projects/%s' % quote_plus(get_repo_slug(repo_url))
+    linked_users = {}
+    for start in range(0, len(numbers), ISSUE_BATCH_SIZE):
+        issues = get(token, hoster.absolute_url(project_url + '/issues'),
+                     {'iids[]': numbers[start:start + ISSUE_BATCH_SIZE]})
+        for issue in issues:
+            number = issue['iid']
+            updated = _format_time(issue['updated_at'])
+            if cached.get(number) and cached[number].updated == updated:
+                linked_users[number] = cached[number]
+                continue
+
+            assignees = sorted(assignee['username']
+                               for assignee in issue.get('assignees') or [])
+            mr_author = None
+            if len(assignees) != 1:
+                mrs = [mr for mr in get(token, hoster.absolute_url(
+                           '%s/issues/%d/closed_by' % (project_url, number)))
+                       if mr['state'] == 'merged']
+                if mrs:
+                    mr_author = mrs[0]['author']['username']
+            linked_users[number] = LinkedUsers(updated, assignees, mr_author)
+    return linked_users
+
+
+def get_repo_linked_users(repo_url, numbers, cached=None):
+    """
+    Get the ``LinkedUsers`` of many issues of a repository, with a few
+    batch requests instead of several requests per issue.
+
+    :param repo_url: ``IssueRepoUrl`` of the repository.
+    :param numbers:  Numbers of the issues.
+    :param cached:   Dict of issue number to the ``LinkedUsers`` resolved
+                     earlier, reused for the issues not updated since.
+    :return: Dict of issue number to ``LinkedUsers``, without the issues
+             which were not found.
+    :raises ValueError: If the repository is not on GitHub or GitLab.
+    """
+    if repo_url.resource == 'github.com':
+        get_users = _get_github_linked_users
+    elif repo_url.resource == 'gitlab.com':
+        get_users = _get_gitlab_linked_users
     else:
-        image_url = 'http://github.com/%s.png' % (org_name)
+        raise ValueError('Issues on %s are not supported' % repo_url.resource)
+    return get_users(get_ihoster(repo_url), get_token(repo_url), repo_url,
+                     sorted(numbers), cached or {})
+
+
+def load_linked_users(path):
+    """
+    :return: Dict of the ``LinkedUsers`` of issues by URL saved by
+             ``save_linked_users``, empty if there are none.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if data.get('version') != LINKED_USERS_VERSION:
+        return {}
+    return dict((url, LinkedUsers(*users))
+                for url, users in data['issues'].items())
+
+
+def save_linked_users(linked_users, path):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': LINKED_USERS_VERSION,
+                   'issues': linked_users}, f)
+    os.replace(tmp_path, path)
+
+
+def _query_github_users(token, logins):
+    exists = {}
+    for start in range(0, len(logins), USER_BATCH_SIZE):
+        batch = logins[start:start + USER_BATCH_SIZE]
+        query = 'query {%s}' % ''.join(
+            'u%d: user(login: %s) { login } ' % (i, json.dumps(login))
+            for i, login in enumerate(batch))
+        result = post(token, GITHUB_API_URL + '/graphql', {'query': query})
+        # Missing users are reported as NOT_FOUND errors
+        errors = [error for error in result.get('errors') or []
+                  if error.get('type') != 'NOT_FOUND']
+        if errors or not result.get('data'):
+            raise RuntimeError('GraphQL query failed: %s' % errors)
+        for i, login in enumerate(batch):
+            exists[login] = bool(result['data'].get('u%d' % i))
+    return exists
+
+
+def _get_github_user(login):
+    """
+    :return: Whether the user exists, or None if it could not be checked.
+    """
+    r = requests.get('%s/users/%s' % (GITHUB_API_URL, login))
+    if r.status_code == 404:
+        return False
+    if r.ok:
+        return True
+    return None
 
-    return requests.get(image_url).content
+
+def get_existing_github_users(logins):
+    """
+    Check which of the logins are those of existing GitHub users.
+
+    With a GitHub token, the users are looked up in batches with the
+    GraphQL API, and otherwise one at a time on a pool of threads. The
+    results are kept in ``GITHUB_USERS_FILE`` for ``GITHUB_USERS_TTL``
+    seconds.
+
+    :return: Set of the logins of existing users, including those which
+             could not be checked.
+    """
+    logger = logging.getLogger(__name__ + '.get_existing_github_users')
+    logins = set(logins)
+    now = time.time()
+    checked = {}
+    try:
+        with open(settings.GITHUB_USERS_FILE) as f:
+            data = json.load(f)
+        if data.get('version') == GITHUB_USERS_VERSION:
+            checked = dict(
+                (login, user) for login, user in data['users'].items()
+                if now - user['checked'] < settings.GITHUB_USERS_TTL)
+    except (IOError, ValueError):
+        pass
+
+    unchecked = sorted(logins - set(checked))
+    exists = {}
+    if unchecked:
+        try:
+            exists = _query_github_users(GitHubToken(get_api_key('GH')),
+                                         unchecked)
+        except TokenMissing:
+            with concurrent.futures.ThreadPoolExecutor(
+                    USER_WORKERS) as executor:
+                exists = dict(zip(unchecked, executor.map(_get_github_user,
+                                                          unchecked)))
+        except Exception as e:
+            logger.error('Unable to look up GitHub users: %s' % e)
+    for login, user_exists in exists.items():
+        if user_exists is not None:
+            checked[login] = {'exists': user_exists, 'checked': now}
+
+    directory = os.path.dirname(settings.GITHUB_USERS_FILE) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': GITHUB_USERS_VERSION, 'users': checked}, f)
+    os.replace(tmp_path, settings.GITHUB_USERS_FILE)
+
+    return set(login for login in logins
+               if login not in checked or checked[login]['exists'])
+
+
+def get_logo(org_name):
+    """
+    Get the logo of the org, downloaded once and revalidated on later
+    builds.
+
+    :return: Bytes of the image.
+    :raises requests.RequestException: If the logo could not be downloaded.
+    """
+    response = cached_get('https://github.com/%s.png' % org_name)
+    response.raise_for_status()
+    return response.content
+
+
+def write_logos(org_name, directory):
+    """Write the ``LOGO_VARIANTS`` of the logo of the org to the directory,
+    only rewriting the files which changed.
+
+    :return: Dict of the name of each variant to its file name, by
+             extension, or None if the logo could not be loaded.
+    """
+    logger = logging.getLogger(__name__ + '.write_logos')
+    try:
+        return write_image_variants(get_logo(org_name), directory,
+                                    LOGO_VARIANTS)
+    # PIL.UnidentifiedImageError of a body which is not an image is an
+    # OSError
+    except (requests.RequestException, OSError) as e:
+        logger.error('Unable to load the logo of %s: %s' % (org_name, e))
+        return None
@@ -1,10 +1,12 @@
-import os.path
+import os
+import tempfile
 
 from ruamel.yaml import YAML
 
 from django.core.management.base import BaseCommand
 
-from gci.students import cleanse_instances
+from community.yamlstream import dump_yaml_items, iter_yaml_items
+from gci.students import iter_cleansed_instances
 from gci.task import cleanse_tasks
 
 
@@ -25,14 +27,17 @@ class Command(BaseCommand):
         with open(os.path.join(input_dir, 'tasks.yaml'), 'r') as f:
             tasks = yaml.load(f)
 
-        with open(os.path.join(input_dir, 'instances.yaml'), 'r') as f:
-            instances = yaml.load(f)
-
         tasks = cleanse_tasks(tasks)
-        instances = cleanse_instances(instances, tasks)
 
         with open(os.path.join(output_dir, 'tasks.yaml'), 'w') as f:
             yaml.dump(tasks, f)
 
-        with open(os.path.join(output_dir, 'instances.yaml'), 'w') as f:
-            yaml.dump(instances, f)
+        # Instances are streamed, and written to a temporary file first in
+        # case the input and output are the same file
+        fd, tmp_path = tempfile.mkstemp(dir=output_dir)
+        with open(os.path.join(input_dir, 'instances.yaml'), 'r') as f, \
+                os.fdopen(fd, 'w') as out:
+            dump_yaml_items(
+                iter_cleansed_instances(iter_yaml_items(f), tasks), out)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(output_dir, 'instances.yaml'))
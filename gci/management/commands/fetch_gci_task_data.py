@@ -1,14 +1,11 @@
-from collections import OrderedDict
 import os.path
 
-from ruamel.yaml import YAML
-
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from gci.config import dump_cache, load_cache
 from gci.students import (
-    _get_instances,
-    _get_tasks,
-)
+    clear_checkpoint, fetch_instances, fetch_tasks, open_checkpoint)
 
 
 class Command(BaseCommand):
@@ -16,25 +13,36 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('output_dir', nargs='?', type=str)
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only fetch the records modified since '
+                                 'the data in output_dir, and only write '
+                                 'the files which changed')
+        parser.add_argument('--restart', action='store_true',
+                            help='Discard the pages saved by an earlier, '
+                                 'interrupted fetch instead of resuming '
+                                 'from them. They are discarded anyway '
+                                 'once older than GCI_CHECKPOINT_MAX_AGE')
 
     def handle(self, *args, **options):
         output_dir = options.get('output_dir')
 
-        tasks = {}
-        for task in _get_tasks():
-            tasks[int(task['id'])] = task
-
-        instances = {}
-        for instance in _get_instances():
-            instances[int(instance['id'])] = instance
-
-        tasks = OrderedDict(sorted(tasks.items(), key=lambda t: t[0]))
-        instances = OrderedDict(sorted(instances.items(), key=lambda t: t[0]))
-
-        yaml = YAML()
-
-        with open(os.path.join(output_dir, 'tasks.yaml'), 'w') as f:
-            yaml.dump(tasks, f)
-
-        with open(os.path.join(output_dir, 'instances.yaml'), 'w') as f:
-            yaml.dump(instances, f)
+        for filename, fetch in (('tasks.yaml', fetch_tasks),
+                                ('instances.yaml', fetch_instances)):
+            checkpoint_dir = os.path.join(settings.GCI_CHECKPOINT_DIR,
+                                          os.path.splitext(filename)[0])
+            if options.get('restart'):
+                clear_checkpoint(checkpoint_dir)
+            elif open_checkpoint(checkpoint_dir):
+                self.stdout.write('Resuming the fetch of %s' % filename)
+
+            snapshot = None
+            if (options.get('incremental')
+                    and os.path.exists(os.path.join(output_dir, filename))):
+                snapshot = load_cache(filename, output_dir)
+
+            data = fetch(snapshot, checkpoint_dir)
+            if snapshot and data == snapshot:
+                self.stdout.write('%s is unchanged' % filename)
+            else:
+                dump_cache(data, filename, output_dir)
+            clear_checkpoint(checkpoint_dir)
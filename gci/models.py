@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 from django.db import models
 
+from community.images import LOGO_VARIANTS, write_field_variants
+
 
 class Student(models.Model):
 
@@ -25,6 +27,14 @@ class Organization(models.Model):
     def __str__(self):
         return self.name
 
+    def write_logos(self, directory):
+        """Write the ``LOGO_VARIANTS`` of the logo to the directory.
+
+        :return: The file names of ``write_image_variants``, or None if
+                 the org has no logo.
+        """
+        return write_field_variants(self.logo, directory, LOGO_VARIANTS)
+
 
 class Task(models.Model):
 
@@ -1,10 +1,24 @@
+from collections import OrderedDict
+import concurrent.futures
+import json
+import math
+import os
 import re
 import logging
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+
+from community.git import get_repo_slug
 
 from .client import GCIAPIClient
 
 from .config import get_api_key, load_cache
-from .gitorg import get_issue
+from .gitorg import (
+    get_linked_users, get_repo_linked_users, load_linked_users,
+    parse_issue_url, save_linked_users)
 from .task import beginner_tasks, get_task
 
 PRIVATE_INSTANCE_STATUSES = (
@@ -19,6 +33,12 @@ PRIVATE_INSTANCE_ATTRIBUTES = (
     'deadline',
 )
 
+# Number of pages of tasks or instances fetched at the same time
+PAGE_WORKERS = 4
+
+# Number of issues of tasks resolved at the same time
+ISSUE_WORKERS = 8
+
 _client = None
 _instances = {}
 
@@ -31,42 +51,201 @@ def get_client():
     return _client
 
 
-def _get_tasks():
-    logger = logging.getLogger(__name__ + '._get_tasks')
-    client = get_client()
-    page = 1
+def _get_next_page(results):
+    if results['next']:
+        match = re.search(r'page=(\d+)', results['next'])
+        if match:
+            return int(match.group(1))
+    return 0
 
-    while page > 0:
-        try:
-            tasks = client.ListTasks(page=page)
-        except Exception as e:
-            logger.error(e.response.content)
-            raise
 
-        for t in tasks['results']:
-            yield t
+def _get_pages(list_page, workers=PAGE_WORKERS):
+    """Yield the results of all pages of a list of the GCI API.
 
-        page = 0
-        if tasks['next']:
-            result = re.search(r'page=(\d+)', tasks['next'])
-            if result:
-                page = int(result.group(1))
+    The number of pages is worked out from the count and the size of the
+    first page, and the other pages are fetched concurrently. Results are
+    yielded in the order of the pages.
 
+    :param list_page: Function fetching a page by its number.
+    :param workers:   Number of pages fetched at the same time.
+    """
+    results = list_page(1)
+    yield from results['results']
+    yield from _get_following_pages(list_page, results, workers)
 
-def _get_instances():
-    client = get_client()
-    page = 1
 
+def _get_following_pages(list_page, results, workers=PAGE_WORKERS):
+    """Yield the results of the pages following a page, fetched as in
+    ``_get_pages``.
+
+    :param results: The page fetched last.
+    """
+    page = _get_next_page(results)
+
+    if page and results.get('count') and results['results']:
+        last_page = math.ceil(results['count'] / len(results['results']))
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            for results in executor.map(list_page,
+                                        range(page, last_page + 1)):
+                yield from results['results']
+        page = _get_next_page(results)
+
+    # Follow the remaining pages, if any were added meanwhile
     while page > 0:
-        instances = client.ListTaskInstances(page=page)
-        for instance in instances['results']:
-            yield instance
+        results = list_page(page)
+        yield from results['results']
+        page = _get_next_page(results)
+
 
-        page = 0
-        if instances['next']:
-            result = re.search(r'page=(\d+)', instances['next'])
-            if result:
-                page = int(result.group(1))
+def _get_updated(list_page, field, since):
+    """Yield the results of the pages of a list of the GCI API, until a
+    page ending with a record modified before ``since``.
+
+    Stopping early relies on the most recently modified records being
+    listed first. Once a page is found out of that order, the remaining
+    pages are all fetched concurrently, as in ``_get_pages``.
+
+    :param list_page: Function fetching a page by its number.
+    :param field:     Name of the modification time of the records.
+    :param since:     Modification time of the latest record known.
+    """
+    logger = logging.getLogger(__name__ + '._get_updated')
+    earliest = None
+    page = 1
+    while page > 0:
+        results = list_page(page)
+        yield from results['results']
+
+        modified = [record[field] for record in results['results']]
+        if modified:
+            if (modified != sorted(modified, reverse=True)
+                    or (earliest is not None and modified[0] > earliest)):
+                logger.warning('Records are not listed by %s, fetching '
+                               'all pages after page %d' % (field, page))
+                yield from _get_following_pages(list_page, results)
+                return
+            earliest = modified[-1]
+            if modified[-1] < since:
+                return
+        page = _get_next_page(results)
+
+
+def _list_tasks(page):
+    logger = logging.getLogger(__name__ + '._get_tasks')
+    try:
+        return get_client().ListTasks(page=page)
+    except Exception as e:
+        # Timeouts and connection errors have no response
+        response = getattr(e, 'response', None)
+        logger.error(e if response is None else response.content)
+        raise
+
+
+def _list_instances(page):
+    return get_client().ListTaskInstances(page=page)
+
+
+def open_checkpoint(directory, max_age=None):
+    """Resume the checkpoint in the directory, or start a new one if there
+    is none, or it was started more than ``max_age`` seconds ago, as the
+    pages saved by then are out of date.
+
+    :param max_age: Defaults to ``settings.GCI_CHECKPOINT_MAX_AGE``.
+    :return:        Whether an earlier checkpoint is resumed.
+    """
+    if max_age is None:
+        max_age = settings.GCI_CHECKPOINT_MAX_AGE
+    path = os.path.join(directory, 'started')
+    try:
+        with open(path) as f:
+            started = float(f.read())
+    except (IOError, ValueError):
+        started = None
+    if started is not None and time.time() - started <= max_age:
+        return True
+
+    clear_checkpoint(directory)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        f.write(repr(time.time()))
+    os.replace(tmp_path, path)
+    return False
+
+
+def _checkpointed(list_page, directory):
+    """Wrap a function fetching pages of a list of the GCI API, so that
+    each page fetched is saved in the directory, and the pages saved there
+    by an earlier, interrupted fetch are loaded instead of fetched again,
+    unless they are stale as in ``open_checkpoint``.
+
+    :param list_page: Function fetching a page by its number.
+    :param directory: Directory of the saved pages of this list.
+    """
+    open_checkpoint(directory)
+
+    def list_checkpointed_page(page):
+        path = os.path.join(directory, '%d.json' % page)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            pass
+        results = list_page(page)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+        return results
+    return list_checkpointed_page
+
+
+def clear_checkpoint(directory):
+    """Remove the pages saved by ``_checkpointed``."""
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _merge_by_id(records, snapshot=None):
+    """Merge records into those of a snapshot, ordered by id."""
+    merged = dict(snapshot or {})
+    merged.update((int(record['id']), record) for record in records)
+    return OrderedDict(sorted(merged.items(), key=lambda t: t[0]))
+
+
+def fetch_tasks(snapshot=None, checkpoint_dir=None):
+    """Fetch all tasks from the GCI API, ordered by id.
+
+    :param snapshot:       Tasks fetched earlier, to only fetch those
+                           modified since then.
+    :param checkpoint_dir: Directory to save the fetched pages in, to
+                           resume from if the fetch is interrupted.
+    """
+    list_page = _list_tasks
+    if checkpoint_dir:
+        list_page = _checkpointed(list_page, checkpoint_dir)
+    if not snapshot:
+        return _merge_by_id(_get_pages(list_page))
+    since = max(task['last_modified'] for task in snapshot.values())
+    return _merge_by_id(_get_updated(list_page, 'last_modified', since),
+                        snapshot)
+
+
+def fetch_instances(snapshot=None, checkpoint_dir=None):
+    """Fetch all task instances from the GCI API, ordered by id.
+
+    :param snapshot:       Instances fetched earlier, to only fetch those
+                           modified since then.
+    :param checkpoint_dir: Directory to save the fetched pages in, to
+                           resume from if the fetch is interrupted.
+    """
+    list_page = _list_instances
+    if checkpoint_dir:
+        list_page = _checkpointed(list_page, checkpoint_dir)
+    if not snapshot:
+        return _merge_by_id(_get_pages(list_page))
+    since = max(instance['modified'] for instance in snapshot.values())
+    return _merge_by_id(_get_updated(list_page, 'modified', since),
+                        snapshot)
 
 
 def get_instances():
@@ -77,23 +256,29 @@ def get_instances():
     return _instances
 
 
-def cleanse_instances(instances, tasks):
-    cleansed_instances = dict(
-        (instance_id, instance)
-        for instance_id, instance
-        in instances.items()
-        if instance['status'] not in PRIVATE_INSTANCE_STATUSES
-        and instance['task_definition_id'] in tasks
-        and instance['task_definition_id'] not in beginner_tasks(tasks)
-    )
-
-    for instance in cleansed_instances.values():
+def iter_cleansed_instances(instances, tasks):
+    """Yield the instances which may be published, without their private
+    attributes.
+
+    :param instances: Iterable of instance id and instance pairs.
+    :param tasks:     Cleansed tasks.
+    """
+    task_ids = set(tasks)
+    beginner_task_ids = set(beginner_tasks(tasks))
+    for instance_id, instance in instances:
+        if (instance['status'] in PRIVATE_INSTANCE_STATUSES
+                or instance['task_definition_id'] not in task_ids
+                or instance['task_definition_id'] in beginner_task_ids):
+            continue
         if instance['status'] != 'COMPLETED':
             instance['status'] = 'CLAIMED'
             for key in PRIVATE_INSTANCE_ATTRIBUTES:
                 del instance[key]
+        yield instance_id, instance
 
-    return cleansed_instances
+
+def cleanse_instances(instances, tasks):
+    return dict(iter_cleansed_instances(instances.items(), tasks))
 
 
 def get_students():
@@ -128,9 +313,79 @@ def get_issue_related_students():
                     break
 
 
+def _get_issue_urls(students):
+    for student in students:
+        for instance in student['instances']:
+            url = get_task(instance['task_definition_id'])['external_url']
+            if url and '/wiki/' not in url:
+                yield url
+
+
+def _resolve_issues(urls, workers=ISSUE_WORKERS):
+    """Get the users linked to each distinct issue, reusing those of the
+    issues not updated since the previous build.
+
+    The issues of each repository are looked up in bulk, and those
+    missing from the bulk lookups one at a time, on a pool of threads.
+
+    :return: Dict of URL to its ``LinkedUsers``, None if it is not an
+             issue, or the exception raised resolving it.
+    """
+    logger = logging.getLogger(__name__ + '._resolve_issues')
+    linked_users = load_linked_users(settings.GCI_LINKED_USERS_FILE)
+    urls = set(urls)
+    resolved = {}
+    repos = {}
+    for url in urls:
+        parsed = parse_issue_url(url)
+        if not parsed:
+            resolved[url] = None
+            continue
+        repo_url, number = parsed
+        repos.setdefault(repo_url, {})[number] = url
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        futures = dict(
+            (executor.submit(get_repo_linked_users, repo_url, list(issues),
+                             dict((number, linked_users[url])
+                                  for number, url in issues.items()
+                                  if url in linked_users)),
+             repo_url)
+            for repo_url, issues in repos.items())
+        for future in concurrent.futures.as_completed(futures):
+            issues = repos[futures[future]]
+            try:
+                index = future.result()
+            except Exception as e:
+                logger.error('Unable to look up the issues of %s: %s'
+                             % (get_repo_slug(futures[future]), e))
+                continue
+            for number, users in index.items():
+                resolved[issues[number]] = users
+
+        futures = dict(
+            (executor.submit(get_linked_users, url, linked_users.get(url)),
+             url)
+            for url in urls - set(resolved))
+        for future in concurrent.futures.as_completed(futures):
+            url = futures[future]
+            try:
+                resolved[url] = future.result()
+            except Exception as e:
+                resolved[url] = e
+
+    for url, users in resolved.items():
+        if users and not isinstance(users, Exception):
+            linked_users[url] = users
+    save_linked_users(linked_users, settings.GCI_LINKED_USERS_FILE)
+    return resolved
+
+
 def get_linked_students():
     logger = logging.getLogger(__name__ + '.get_linked_students')
-    for student in list(get_issue_related_students()):
+    students = list(get_issue_related_students())
+    issues = _resolve_issues(_get_issue_urls(students))
+    for student in students:
         instances = student['instances']
         for instance in instances:
             task = get_task(instance['task_definition_id'])
@@ -141,42 +396,33 @@ def get_linked_students():
             elif '/wiki/' in url:
                 pass
             else:
-                try:
-                    issue = get_issue(url)
-                    # Ensure assignees works before continuing
-                    issue.assignees
-                except Exception as e:
+                users = issues[url]
+                if isinstance(users, Exception):
                     print('Failed to load task %d url %s: %s' %
-                          (task_id, url, e))
+                          (task_id, url, users))
                     continue
-                if not issue:
+                if not users:
                     logger.info('task %d url not recognised: %s' %
                                 (task_id, url))
                 else:
-                    if len(issue.assignees) == 0:
+                    if len(users.assignees) == 0:
                         logger.info('task %d: No assignees for %s' %
                                     (task_id, url))
-                    elif len(issue.assignees) > 1:
+                    elif len(users.assignees) > 1:
                         logger.info('task %d: Many assignees for %s: %s' %
-                                    (task_id, url, ', '.join(issue.assignees)))
+                                    (task_id, url, ', '.join(users.assignees)))
                     else:
-                        student['username'] = list(issue.assignees)[0].username
+                        student['username'] = users.assignees[0]
                         print('student %s is %s because of %s' %
                               (student['id'], student['username'], url))
                         yield student
                         break
 
-                    if len(issue.mrs_closed_by) == 0:
+                    if not users.mr_author:
                         logger.info('task %d: No mrs closing %s' %
                                     (task_id, url))
-                    elif len(issue.mrs_closed_by) == 0:
-                        logger.info('task %d: Many mrs closing %s' %
-                                    (task_id, url))
                     else:
-                        mr = list(issue.mrs_closed_by)[0]
-                        user = mr.author
-
-                        student['username'] = user.username
+                        student['username'] = users.mr_author
                         print('student %s is %s because of %s (from PR)' %
                               (student['id'], student['username'], url))
                         yield student
@@ -1,3 +1,599 @@
-# from django.test import TestCase
+import asyncio
+import datetime
+import functools
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, TestCase
+from PIL import Image
+
+from community.config import TokenMissing
+
+from .aioclient import AsyncGCIAPIClient
+from .client import GCIAPIClient
+from .config import dump_cache, load_cache
+from .feeds import ALL_TASKS, select_feeds
+from .gitorg import (
+    LinkedUsers, get_existing_github_users, get_linked_users,
+    get_repo_linked_users, parse_issue_url, write_logos)
+from .models import Organization
+from .students import (
+    _checkpointed, _get_pages, _get_updated, _list_tasks,
+    get_linked_students, open_checkpoint)
+from .views import write_org_logos
+
+
+class GCIHandler(BaseHTTPRequestHandler):
+    # Status, headers and body of the responses to send, in order
+    responses = []
+    paths = []
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        status, headers, body = self.responses.pop(0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GCIAPIClientTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), GCIHandler)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        GCIHandler.paths = []
+        url = 'http://127.0.0.1:%d/' % self.server.server_port
+        self.client = GCIAPIClient('token', url_prefix=url, backoff_factor=0)
+
+    def test_retry(self):
+        body = json.dumps({'results': [], 'next': None}).encode()
+        GCIHandler.responses = [
+            (503, {'Retry-After': '0'}, b''),
+            (429, {'Retry-After': '0'}, b''),
+            (200, {'Content-Type': 'application/json'}, body),
+        ]
+        self.assertEqual(self.client.ListTasks(page=2)['results'], [])
+        self.assertEqual(GCIHandler.paths,
+                         ['/api/program/current/tasks/?page=2'] * 3)
+        self.assertEqual(self.client.latency['ListTasks']['count'], 1)
+
+    def test_client_error(self):
+        GCIHandler.responses = [(404, {}, b'')]
+        with self.assertRaises(requests.HTTPError):
+            self.client.GetTask(1)
+        self.assertEqual(len(GCIHandler.paths), 1)
+
+
+class GetPagesTest(SimpleTestCase):
+
+    def test_pages(self):
+        # More tasks were added after the count was taken
+        ids = list(range(1, 24))
+        requested = []
+
+        def list_page(page):
+            requested.append(page)
+            results = ids[(page - 1) * 5:page * 5]
+            return {
+                'count': 14,
+                'results': [{'id': i} for i in results],
+                'next': ('https://example.com/?page=%d' % (page + 1)
+                         if page * 5 < len(ids) else None),
+            }
+
+        self.assertEqual([t['id'] for t in _get_pages(list_page, 3)], ids)
+        self.assertEqual(sorted(requested), [1, 2, 3, 4, 5])
+
+    def test_list_tasks_timeout(self):
+        client = mock.Mock()
+        client.ListTasks.side_effect = requests.ConnectTimeout('timed out')
+        with mock.patch('gci.students.get_client', return_value=client), \
+                self.assertLogs('gci.students', 'ERROR') as logs, \
+                self.assertRaises(requests.ConnectTimeout):
+            _list_tasks(1)
+        self.assertIn('timed out', logs.output[0])
+
+
+class AsyncGCIAPIClientTest(SimpleTestCase):
+
+    def test_get_tasks(self):
+        client = AsyncGCIAPIClient('token', concurrency=3, rate=1000)
+        self.addCleanup(client.close)
+        running = []
+        peak = []
+
+        def get_task(task_id):
+            running.append(task_id)
+            peak.append(len(running))
+            time.sleep(0.01)
+            running.remove(task_id)
+            return {'id': task_id}
+        client.client.GetTask = get_task
+
+        # The client may be used from several event loops
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            try:
+                tasks = loop.run_until_complete(client.GetTasks(range(10)))
+            finally:
+                loop.close()
+            self.assertEqual([task['id'] for task in tasks], list(range(10)))
+        self.assertLessEqual(max(peak), 3)
+
+    def test_rate(self):
+        clients = [AsyncGCIAPIClient('token', rate=rate)
+                   for rate in (5, 10, 10)]
+        for client in clients:
+            self.addCleanup(client.close)
+        self.assertEqual(clients[0].rate_limiter.interval, 0.2)
+        self.assertEqual(clients[1].rate_limiter.interval, 0.1)
+        self.assertIs(clients[1].rate_limiter, clients[2].rate_limiter)
+
+        clients[0].client.GetTask = lambda task_id: {'id': task_id}
+        loop = asyncio.new_event_loop()
+        try:
+            start = time.monotonic()
+            loop.run_until_complete(clients[0].GetTasks(range(3)))
+        finally:
+            loop.close()
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+
+class GetUpdatedTest(SimpleTestCase):
+
+    def make_list_page(self, modified, requested):
+        def list_page(page):
+            requested.append(page)
+            return {
+                'count': len(modified),
+                'results': [{'modified': m}
+                            for m in modified[(page - 1) * 2:page * 2]],
+                'next': ('https://example.com/?page=%d' % (page + 1)
+                         if page * 2 < len(modified) else None),
+            }
+        return list_page
+
+    def test_stop(self):
+        requested = []
+        list_page = self.make_list_page(['5', '4', '3', '2', '1'],
+                                        requested)
+        self.assertEqual(
+            [r['modified'] for r in _get_updated(list_page, 'modified', '3')],
+            ['5', '4', '3', '2'])
+        self.assertEqual(requested, [1, 2])
+
+    def test_unordered(self):
+        requested = []
+        list_page = self.make_list_page(['1', '5', '2', '1', '1', '1'],
+                                        requested)
+        with self.assertLogs('gci.students._get_updated', 'WARNING'), \
+                mock.patch('concurrent.futures.ThreadPoolExecutor',
+                           wraps=ThreadPoolExecutor) as executor:
+            self.assertEqual(
+                len(list(_get_updated(list_page, 'modified', '3'))), 6)
+        # The pages after the first one out of order are fetched
+        # concurrently
+        self.assertEqual(sorted(requested), [1, 2, 3])
+        self.assertTrue(executor.called)
+
+
+class CheckpointedTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_resume(self):
+        requested = []
+
+        def list_page(page):
+            requested.append(page)
+            if page == 3:
+                raise requests.HTTPError('503 Server Error')
+            return {'results': [{'id': page}],
+                    'next': 'https://example.com/?page=%d' % (page + 1)
+                    if page < 3 else None}
+
+        with self.assertRaises(requests.HTTPError):
+            list(_get_pages(_checkpointed(list_page, self.directory), 1))
+        self.assertEqual(requested, [1, 2, 3])
+
+        def list_page(page):
+            requested.append(page)
+            return {'results': [{'id': page}], 'next': None}
+
+        self.assertEqual(
+            list(_get_pages(_checkpointed(list_page, self.directory), 1)),
+            [{'id': 1}, {'id': 2}, {'id': 3}])
+        self.assertEqual(requested, [1, 2, 3, 3])
+
+    def test_stale(self):
+        def list_page(page):
+            return {'results': [{'id': page}], 'next': None}
+
+        list(_get_pages(_checkpointed(list_page, self.directory), 1))
+        self.assertTrue(open_checkpoint(self.directory))
+        with self.settings(GCI_CHECKPOINT_MAX_AGE=3600), \
+                mock.patch('time.time', return_value=time.time() + 7200):
+            self.assertFalse(open_checkpoint(self.directory))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['started'])
+
+
+class LoadCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'tasks.yaml')
+        self.compiled_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.compiled_dir)
+        patcher = mock.patch('gci.config.GCI_COMPILED_CACHE_DIR',
+                             self.compiled_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_compiled(self):
+        dump_cache({1: {'id': 1, 'name': 'Task'}}, 'tasks.yaml',
+                   self.directory)
+        self.assertEqual(os.listdir(self.directory), ['tasks.yaml'])
+        self.assertEqual(len(os.listdir(self.compiled_dir)), 1)
+
+        with mock.patch('ruamel.yaml.load') as load:
+            os.utime(self.path, (0, 0))
+            self.assertEqual(load_cache('tasks.yaml', self.directory),
+                             {1: {'id': 1, 'name': 'Task'}})
+            self.assertFalse(load.called)
+
+        with open(self.path, 'w') as f:
+            f.write('2:\n  id: 2\n')
+        self.assertEqual(load_cache('tasks.yaml', self.directory),
+                         {2: {'id': 2}})
+
+        # A compiled cache referring to a class which no longer exists
+        # is replaced
+        compiled = os.path.join(self.compiled_dir,
+                                os.listdir(self.compiled_dir)[0])
+        with open(compiled, 'wb') as f:
+            f.write(b'cgci.config\nRemovedClass\n.')
+        self.assertEqual(load_cache('tasks.yaml', self.directory),
+                         {2: {'id': 2}})
+
+
+class GetLinkedStudentsTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings = self.settings(GCI_LINKED_USERS_FILE=os.path.join(
+            directory, 'gci_issues.json'))
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def make_issue(self, assignees, mr_authors):
+        issue = mock.Mock(updated=datetime.datetime(2017, 12, 1),
+                          assignees=[mock.Mock(username=username)
+                                     for username in assignees])
+        mrs_closed_by = mock.PropertyMock(return_value=[
+            mock.Mock(author=mock.Mock(username=username))
+            for username in mr_authors])
+        type(issue).mrs_closed_by = mrs_closed_by
+        return issue, mrs_closed_by
+
+    def get_students(self, urls):
+        tasks = dict((task_id, {'id': task_id, 'external_url': url})
+                     for task_id, url in urls.items())
+
+        def get_students():
+            return [{'id': task_id,
+                     'instances': [{'task_definition_id': task_id}]}
+                    for task_id in tasks]
+        return get_students, tasks
+
+    def test_get_linked_students(self):
+        urls = {
+            1: 'https://github.com/org/repo/issues/1',
+            2: 'https://github.com/org/repo/issues/1',
+            3: 'https://github.com/org/repo/issues/2',
+        }
+        get_students, tasks = self.get_students(urls)
+        issue, assigned_mrs = self.make_issue(['alice'], [])
+        unassigned, unassigned_mrs = self.make_issue([], ['bob'])
+        issues = {urls[1]: issue, urls[3]: unassigned}
+
+        with mock.patch('gci.students.get_issue_related_students',
+                        get_students), \
+                mock.patch('gci.students.get_task', tasks.get), \
+                mock.patch('gci.students.get_repo_linked_users',
+                           return_value={}), \
+                mock.patch('gci.gitorg.get_issue',
+                           side_effect=issues.get) as get_issue, \
+                mock.patch('gci.gitorg.requests.get',
+                           return_value=mock.Mock(status_code=304)) as get, \
+                mock.patch('builtins.print'):
+            for _ in range(2):
+                self.assertEqual(
+                    [student['username']
+                     for student in get_linked_students()],
+                    ['alice', 'alice', 'bob'])
+
+        # The cached issues are only revalidated on the second build
+        self.assertEqual(get_issue.call_count, 2)
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(get.call_args[1]['headers']['If-Modified-Since'],
+                         'Fri, 01 Dec 2017 00:00:00 GMT')
+        self.assertFalse(assigned_mrs.called)
+        self.assertEqual(unassigned_mrs.call_count, 1)
+
+    def test_bulk_lookup(self):
+        urls = {
+            1: 'https://github.com/org/repo/issues/1',
+            2: 'https://github.com/org/repo/issues/2',
+            3: 'https://gitlab.com/org/repo/issues/3',
+        }
+        get_students, tasks = self.get_students(urls)
+        repo_users = {
+            'github.com': {
+                1: LinkedUsers('2017-12-01T00:00:00', ['alice'], None)},
+        }
+
+        def get_repo_linked_users(repo_url, numbers, cached):
+            return repo_users.get(repo_url.resource, {})
+
+        with mock.patch('gci.students.get_issue_related_students',
+                        get_students), \
+                mock.patch('gci.students.get_task', tasks.get), \
+                mock.patch('gci.students.get_repo_linked_users',
+                           side_effect=get_repo_linked_users) as bulk, \
+                mock.patch('gci.students.get_linked_users',
+                           return_value=LinkedUsers(
+                               '2017-12-01T00:00:00', ['bob'], None)
+                           ) as get_linked_users, \
+                mock.patch('builtins.print'):
+            self.assertEqual(
+                sorted(student['username']
+                       for student in get_linked_students()),
+                ['alice', 'bob', 'bob'])
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(sorted(call[0][0]
+                                for call in get_linked_users.call_args_list),
+                         [urls[2], urls[3]])
+
+
+class GetLinkedUsersTest(SimpleTestCase):
+
+    @mock.patch('gci.gitorg.get_api_key', side_effect=TokenMissing('GH'))
+    def test_updated(self, get_api_key):
+        url = 'https://github.com/org/repo/issues/1'
+        updated = datetime.datetime(2017, 12, 1, 12, 0, 0, 500000,
+                                    tzinfo=datetime.timezone(
+                                        datetime.timedelta(hours=2)))
+        issue = mock.Mock(updated=updated, assignees=[
+            mock.Mock(username='alice')])
+
+        with mock.patch('gci.gitorg.get_issue', return_value=issue):
+            linked_users = get_linked_users(url)
+        self.assertEqual(linked_users,
+                         LinkedUsers('2017-12-01T10:00:00', ['alice'], None))
+
+        # Times stored in other formats are still revalidated
+        for cached_updated in ('2017-12-01T10:00:00.500000+00:00',
+                               '2017-12-01T12:00:00+02:00',
+                               'not a time'):
+            cached = linked_users._replace(updated=cached_updated)
+            with mock.patch('gci.gitorg.requests.get',
+                            return_value=mock.Mock(status_code=304)), \
+                    mock.patch('gci.gitorg.get_issue',
+                               return_value=issue) as get_issue:
+                self.assertIn(get_linked_users(url, cached),
+                              (cached, linked_users))
+            self.assertEqual(get_issue.called,
+                             cached_updated == 'not a time')
+
+
+class GetRepoLinkedUsersTest(SimpleTestCase):
+
+    def test_github(self):
+        hoster = mock.Mock(absolute_url='https://api.github.com'.__add__)
+        patcher = mock.patch('gci.gitorg.get_token',
+                             return_value=mock.Mock(value='token'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        data = {'repository': {
+            'i1': {'updatedAt': '2017-12-01T10:00:00Z',
+                   'assignees': {'nodes': [{'login': 'alice'}]},
+                   'timelineItems': {'nodes': []}},
+            'i2': {'updatedAt': '2017-12-02T10:00:00Z',
+                   'assignees': {'nodes': []},
+                   'timelineItems': {'nodes': [
+                       {'closer': {'author': {'login': 'bob'}}}]}},
+            'i3': None,
+        }}
+        repo_url = parse_issue_url('https://github.com/org/repo/issues/1')[0]
+
+        with mock.patch('gci.gitorg.get_ihoster', return_value=hoster), \
+                mock.patch('gci.gitorg.post',
+                           return_value={'data': data}) as post:
+            self.assertEqual(
+                get_repo_linked_users(repo_url, [3, 2, 1]),
+                {1: LinkedUsers('2017-12-01T10:00:00', ['alice'], None),
+                 2: LinkedUsers('2017-12-02T10:00:00', [], 'bob')})
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(post.call_args[0][1],
+                         'https://api.github.com/graphql')
+        self.assertIn('repository(owner: "org", name: "repo")',
+                      post.call_args[0][2]['query'])
+
+        # Cached issues which are unchanged are reused, without another
+        # request per issue
+        cached = {1: LinkedUsers('2017-12-01T10:00:00', ['carol'], None),
+                  2: LinkedUsers('2017-12-01T10:00:00', [], None)}
+
+        with mock.patch('gci.gitorg.get_ihoster', return_value=hoster), \
+                mock.patch('gci.gitorg.requests.get') as get, \
+                mock.patch('gci.gitorg.post',
+                           return_value={'data': data}) as post:
+            self.assertEqual(
+                get_repo_linked_users(repo_url, [3, 2, 1], cached),
+                {1: cached[1],
+                 2: LinkedUsers('2017-12-02T10:00:00', [], 'bob')})
+
+        self.assertFalse(get.called)
+        self.assertEqual(post.call_count, 1)
+
+
+class WriteLogosTest(SimpleTestCase):
+
+    def test_invalid(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        not_found = requests.Response()
+        not_found.status_code = 404
+        not_image = requests.Response()
+        not_image.status_code = 200
+        not_image._content = b'<html></html>'
+
+        for response in (not_found, not_image):
+            with mock.patch('gci.gitorg.cached_get', return_value=response):
+                self.assertIsNone(write_logos('org', directory))
+        self.assertEqual(os.listdir(directory), [])
+
+
+class WriteOrgLogosTest(TestCase):
+
+    def test_model_logo(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), (20, 200, 20)).save(image, 'PNG')
+        with open(os.path.join(directory, 'org.png'), 'wb') as f:
+            f.write(image.getvalue())
+        Organization.objects.create(identifier=1, name='org',
+                                    logo='org.png')
+        output_dir = os.path.join(directory, 'site')
+
+        with self.settings(MEDIA_ROOT=directory), \
+                mock.patch('gci.views.write_logos') as write_logos:
+            self.assertTrue(write_org_logos(1, 'org', output_dir))
+            self.assertFalse(write_logos.called)
+            write_org_logos(2, 'other', output_dir)
+            write_logos.assert_called_once_with('other', output_dir)
+
+        self.assertEqual(
+            sorted(os.listdir(output_dir)),
+            ['.variants.json', 'favicon.png', 'org_logo.png',
+             'org_logo.webp'])
+
+
+class GetExistingGitHubUsersTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings = self.settings(GITHUB_USERS_FILE=os.path.join(
+            directory, 'github_users.json'))
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    @mock.patch('gci.gitorg.get_api_key', side_effect=TokenMissing('GH'))
+    def test_anonymous(self, get_api_key):
+        statuses = {'alice': 200, 'bob': 404, 'carol': 403}
+
+        def get(url):
+            return mock.Mock(status_code=statuses[url.rsplit('/', 1)[1]],
+                             ok=statuses[url.rsplit('/', 1)[1]] == 200)
+
+        with mock.patch('requests.get', side_effect=get) as requests_get:
+            for _ in range(2):
+                self.assertEqual(get_existing_github_users(statuses),
+                                 {'alice', 'carol'})
+
+        # Only the rate limited user is checked again
+        self.assertEqual(requests_get.call_count, 4)
+
+    @mock.patch('gci.gitorg.get_api_key', return_value='token')
+    def test_graphql(self, get_api_key):
+        result = {
+            'data': {'u0': {'login': 'alice'}, 'u1': None},
+            'errors': [{'type': 'NOT_FOUND', 'path': ['u1']}],
+        }
+        with mock.patch('gci.gitorg.post', return_value=result) as post:
+            self.assertEqual(get_existing_github_users(['bob', 'alice']),
+                             {'alice'})
+        self.assertEqual(post.call_count, 1)
+        self.assertIn('u1: user(login: "bob")', post.call_args[0][2]['query'])
+
+
+class LatestTasksFeedTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.tasks = dict((task_id, {
+            'id': task_id,
+            'name': 'Task %d' % task_id,
+            'description': '*Task* %d' % task_id,
+            'external_url': None,
+            'last_modified': '2017-12-%02dT10:00:00Z' % task_id,
+            'tags': ['Python'] if task_id % 2 else ['Docs'],
+            'categories': [task_id % 3 + 1],
+        }) for task_id in range(1, 11))
+        dump_cache(self.tasks, 'tasks.yaml', directory)
+
+        for patcher in (
+                mock.patch('gci.feeds.GCI_DATA_DIR', directory),
+                mock.patch('gci.feeds.load_cache', functools.partial(
+                    load_cache, directory=directory)),
+                mock.patch('gci.feeds._feeds_stat', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.settings = self.settings(GCI_FEED_DESCRIPTIONS_FILE=os.path.join(
+            directory, 'gci_feed.json'))
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_select_feeds(self):
+        feeds = select_feeds(self.tasks.values(), 3)
+        self.assertEqual([task['id'] for task in feeds[ALL_TASKS]],
+                         [10, 9, 8])
+        self.assertEqual([task['id'] for task in feeds['tag', 'python']],
+                         [9, 7, 5])
+        self.assertEqual([task['id'] for task in feeds['category', 1]],
+                         [9, 6, 3])
+
+    def test_feeds(self):
+        response = self.client.get('/gci/tasks/tag/python/rss.xml')
+        self.assertContains(response, '<title>GCI tasks feed: python</title>')
+        self.assertContains(response, '&lt;em&gt;Task&lt;/em&gt; 9')
+        self.assertNotContains(response, 'Task 10')
+
+        response = self.client.get('/gci/tasks/category/3/rss.xml')
+        self.assertContains(response, 'Task 8')
+        self.assertEqual(
+            self.client.get('/gci/tasks/tag/java/rss.xml').status_code, 404)
+
+        with mock.patch('markdown2.markdown') as markdown:
+            with mock.patch('gci.feeds._feeds_stat', None):
+                self.client.get('/gci/tasks/rss.xml')
+        self.assertFalse(markdown.called)
@@ -2,10 +2,10 @@ from django.http import HttpResponse
 from datetime import datetime
 from calendar import timegm
 import logging
-import requests
 
+from .models import Organization
 from .students import get_linked_students
-from .gitorg import get_logo
+from .gitorg import get_existing_github_users, write_logos
 from .task import get_tasks
 
 STUDENT_URL = (
@@ -28,6 +28,23 @@ def index(request):
     return HttpResponse('\n'.join(s))
 
 
+def write_org_logos(org_id, org_name, directory):
+    """Write the logo variants of the org, from the logo of its
+    ``Organization`` if it has one, and otherwise from GitHub.
+
+    :return: The file names of ``write_image_variants``, or None if the
+             logo could not be loaded.
+    """
+    logger = logging.getLogger(__name__ + '.write_org_logos')
+    org = Organization.objects.filter(identifier=org_id).first()
+    if org and org.logo:
+        try:
+            return org.write_logos(directory)
+        except OSError as e:
+            logger.error('Unable to load the logo of %s: %s' % (org, e))
+    return write_logos(org_name, directory)
+
+
 def gci_overview():
     logger = logging.getLogger(__name__ + '.gci_overview')
     linked_students = list(get_linked_students())
@@ -40,28 +57,24 @@ def gci_overview():
     s = []
     s.append('<link rel="stylesheet" href="static/main.css">')
 
-    favicon = get_logo(org_name, 16)
-    with open('_site/favicon.png', 'wb') as favicon_file:
-        favicon_file.write(favicon)
-
-    org_logo = get_logo(org_name)
-    with open('_site/org_logo.png', 'wb') as org_logo_file:
-        org_logo_file.write(org_logo)
-
-    s.append('<link rel="shortcut icon" type="image/png" '
-             'href="static/favicon.png"/>')
-    s.append('<img src="static/org_logo.png" alt="'+org_name+'">')
+    if write_org_logos(org_id, org_name, '_site'):
+        s.append('<link rel="shortcut icon" type="image/png" '
+                 'href="static/favicon.png"/>')
+        s.append('<picture>'
+                 '<source srcset="static/org_logo.webp" type="image/webp">'
+                 '<img src="static/org_logo.png" alt="'+org_name+'">'
+                 '</picture>')
     s.append('<h2>Welcome</h2>')
     s.append('Hello, world. You are at the {org_name} community GCI website.'
              .format(org_name=org_name))
     s.append('Students linked to %s issues:<ul class="students">' % org_name)
+    existing_users = get_existing_github_users(
+        student['username'] for student in linked_students)
     for student in linked_students:
         student_id = student['id']
         username = student['username']
 
-        r = requests.get('https://api.github.com/users/{}'.format(username))
-
-        if r.status_code == 404:
+        if username not in existing_users:
             continue
 
         student_url = STUDENT_URL.format(org_id=org_id,
@@ -1,6 +1,8 @@
 from django.db import models
 from eventtools.models import BaseEvent, BaseOccurrence
 
+from community.images import LOGO_VARIANTS, write_field_variants
+
 
 class Gsoc(models.Model):
     count = models.IntegerField(primary_key=True)
@@ -161,6 +163,14 @@ class Organization(models.Model):
     def __str__(self):
         return self.name
 
+    def write_logos(self, directory):
+        """Write the ``LOGO_VARIANTS`` of the logo to the directory.
+
+        :return: The file names of ``write_image_variants``, or None if
+                 the org has no logo.
+        """
+        return write_field_variants(self.logo, directory, LOGO_VARIANTS)
+
 
 class Student(models.Model):
     name = models.CharField(max_length=100)
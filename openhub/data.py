@@ -1,10 +1,10 @@
 import json
 import logging
 
-import requests
 import xmltodict
 
 from community.git import get_org_name
+from community.httpcache import cached_get
 from openhub.oh_token import OH_TOKEN
 from openhub.outside_projects import get_outside_projects_data
 from openhub.portfolio_projects import get_portfolio_projects_data
@@ -21,7 +21,7 @@ def get_data(for_what):
                       + get_org_name() + '/' + for_what + '.xml?api_key='
                       + OH_TOKEN + '&page=' + str(i))
         try:
-            resp = requests.get(import_url)
+            resp = cached_get(import_url)
             jsonString = json.dumps(xmltodict.parse(resp.content), indent=4)
             json_object = json.loads(jsonString)
         except Exception as ex:
@@ -51,5 +51,8 @@ def get_data(for_what):
             except Exception as ex:
                 logger.error(ex)
                 break
+        # xmltodict parses a page of one record to the record itself
+        if isinstance(data, dict):
+            data = [data]
         data_list = data_list + data
     return data_list
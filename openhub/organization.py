@@ -1,10 +1,10 @@
 import json
 import logging
 
-import requests
 import xmltodict
 
 from community.git import get_org_name
+from community.httpcache import cached_get
 from openhub.oh_token import OH_TOKEN
 from openhub.models import InfographicDetail, Organization
 
@@ -12,7 +12,7 @@ from openhub.models import InfographicDetail, Organization
 def get_organization_data():
     import_url = ('https://www.openhub.net/orgs/'
                   + get_org_name() + '.xml?api_key=' + OH_TOKEN)
-    resp = requests.get(import_url)
+    resp = cached_get(import_url)
     jsonString = json.dumps(xmltodict.parse(resp.content), indent=4)
     json_object = json.loads(jsonString)
     jdict = json_object['response']['result']['org']
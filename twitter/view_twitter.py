@@ -1,9 +1,9 @@
 from django.http import HttpResponse
-import requests
 import json
 import logging
 
 from community.git import get_org_name
+from community.httpcache import cached_get
 
 
 def index(request):
@@ -17,7 +17,7 @@ def index(request):
              'href="../static/favicon.png"/>')
 
     api_data_dump = json.loads(
-        requests.get('https://gci-leaders.netlify.com/data.json').content)
+        cached_get('https://gci-leaders.netlify.com/data.json').content)
     for item in api_data_dump:
         if item['name'] == org_name:
             org_twitter_handle = item['twitter_url'].split(